@@ -61,7 +61,14 @@ def send_emails():
             csv_file=data.csv_file,
             template=data.template,
             skip_unsubscribed_sync=data.skip_unsubscribed_sync,
-            is_test_mode=(data.mode.value == "test")
+            is_test_mode=(data.mode.value == "test"),
+            where=data.where,
+            join_file=data.join,
+            join_on=data.on,
+            only_new=data.only_new,
+            campaign=data.campaign,
+            sample_size=data.sample,
+            stratify=data.stratify
         )
         
         # Preparar a resposta
@@ -25,6 +25,13 @@ class SendEmailRequest:
     csv_file: Optional[str] = None
     skip_unsubscribed_sync: bool = False
     titulo: Optional[str] = None
+    where: Optional[str] = None
+    join: Optional[str] = None
+    on: str = "email"
+    only_new: bool = False
+    campaign: Optional[str] = None
+    sample: Optional[int] = None
+    stratify: Optional[str] = None
     
 @dataclass
 class ReportData:
@@ -125,7 +125,27 @@ class Config:
             "test_recipient": self.config["email"].get("test_recipient"),
             "batch_delay": int(self.config["email"].get("batch_delay", 60)),
             "unsubscribe_file": self.config["email"].get("unsubscribe_file", "data/descadastros.csv"),
-            "test_emails_file": self.config["email"].get("test_emails_file", "data/test_emails.csv")
+            "test_emails_file": self.config["email"].get("test_emails_file", "data/test_emails.csv"),
+            "render_workers": int(self.config["email"].get("render_workers", 1)),
+            "render_queue_size": int(self.config["email"].get("render_queue_size", 0)),
+            "render_cache_size": int(self.config["email"].get("render_cache_size", 1024)),
+            "streaming_reader": bool(self.config["email"].get("streaming_reader", False)),
+            "reader_chunk_size": int(self.config["email"].get("reader_chunk_size", 50000)),
+            "status_flush_records": int(self.config["email"].get("status_flush_records", 100)),
+            "status_flush_bytes": int(self.config["email"].get("status_flush_bytes", 65536)),
+            "status_flush_interval": int(self.config["email"].get("status_flush_interval", 300)),
+            "backup_dir": self.config["email"].get("backup_dir", "backup"),
+            "backup_retention": int(self.config["email"].get("backup_retention", 5)),
+            "backup_compress": bool(self.config["email"].get("backup_compress", True)),
+            "parse_workers": int(self.config["email"].get("parse_workers", 0)),
+            "streaming_dedupe": bool(self.config["email"].get("streaming_dedupe", False)),
+            "address_normalization": bool(self.config["email"].get("address_normalization", True)),
+            "address_rules": self.config["email"].get("address_rules") or {},
+            "campaign_history_dir": self.config["email"].get("campaign_history_dir", "data/campaigns"),
+            "sample_file": self.config["email"].get("sample_file", "data/sample_emails.csv"),
+            "email_validation": bool(self.config["email"].get("email_validation", True)),
+            "blocked_domains": self.config["email"].get("blocked_domains") or [],
+            "disposable_domains_file": self.config["email"].get("disposable_domains_file")
         }
 
     @property
@@ -48,12 +48,14 @@ def remove_duplicates(
     column: str = typer.Option("email", "--column", "-c", help="Coluna a ser usada para identificar duplicados"),
     keep: str = typer.Option("first", "--keep", "-k", help="Qual ocorrência manter ('first', 'last')"),
     output_file: str = typer.Option(None, "--output", "-o", help="Arquivo de saída. Se não especificado, substitui o original"),
+    streaming: Optional[bool] = typer.Option(None, "--streaming/--in-memory", help="Deduplicar sem carregar o arquivo na memória (padrão: streaming_dedupe da configuração)"),
     config_file: str = typer.Option("config/config.yaml", "--config", help="Caminho para o arquivo de configuração")
 ):
     """
     Remove linhas duplicadas de um arquivo CSV baseado em uma coluna específica.
     
     Por padrão, remove duplicados baseados na coluna 'email' e mantém a primeira ocorrência.
+    Com --streaming, arquivos maiores que a memória são processados em disco.
     """
     try:
         print(f"Removendo duplicados do arquivo {csv_file} baseado na coluna '{column}'...")
@@ -68,7 +70,8 @@ def remove_duplicates(
                 csv_file=csv_file,
                 column=column,
                 keep=keep,
-                output_file=output_file
+                output_file=output_file,
+                streaming=streaming
             )
             
             # Exibir resultado
@@ -87,6 +90,7 @@ def remove_duplicates(
                     print(f"🔄 Backup criado em: {backup_file}")
             else:
                 print(f"✅ Nenhum duplicado encontrado para a coluna '{column}'.")
+            print(f"⚡ {result['linhas_por_segundo']:,} linhas/s ({result['duracao']}s)")
                 
         except FileNotFoundError as e:
             print(f"❌ Erro: {str(e)}")
@@ -108,7 +112,15 @@ def send_emails(
     content_file: str = typer.Option("config/email.yaml", "--content", help="Path to email content file"),
     skip_unsubscribed_sync: bool = typer.Option(False, "--skip-sync", help="Skip unsubscribed emails synchronization before sending"),
     mode: SendMode = typer.Option(..., help="Modo de envio obrigatório: especifique --mode=test ou --mode=production"),
-    bounces_file: str = typer.Option("data/bounces.csv", "--bounces-file", help="Caminho para o arquivo CSV com emails de bounce (coluna 'email')")
+    bounces_file: str = typer.Option("data/bounces.csv", "--bounces-file", help="Caminho para o arquivo CSV com emails de bounce (coluna 'email')"),
+    where: Optional[str] = typer.Option(None, "--where", "-w", help='Envia apenas ao segmento, ex.: \'cidade == "São Paulo" and empresa != ""\''),
+    join: Optional[str] = typer.Option(None, "--join", help="Arquivo CSV com colunas extras para o template (ex.: exportação do CRM)"),
+    on: str = typer.Option("email", "--on", help="Coluna que relaciona a lista de destinatários ao arquivo do --join"),
+    only_new: bool = typer.Option(False, "--only-new", help="Envia apenas para endereços que ainda não receberam esta campanha"),
+    campaign: Optional[str] = typer.Option(None, "--campaign", help="Nome da campanha usada pelo --only-new (padrão: nome do template)"),
+    sample: Optional[int] = typer.Option(None, "--sample", help="Envia para uma amostra aleatória de N destinatários (por padrão da lista de produção)"),
+    stratify: Optional[str] = typer.Option(None, "--stratify", help="Distribui a amostra entre os valores de uma coluna ('domain' = domínio do email)"),
+    seed: Optional[int] = typer.Option(None, "--seed", help="Semente da amostra, para repetir o mesmo sorteio")
 ):
     """
     Send batch HTML emails using a CSV file and HTML email template.
@@ -142,7 +154,15 @@ def send_emails(
             template=template_path, # Usar o template_path lido da configuração
             skip_unsubscribed_sync=skip_unsubscribed_sync,
             is_test_mode=(mode == SendMode.test),
-            bounces_file_path=bounces_file # Passar o novo argumento
+            bounces_file_path=bounces_file, # Passar o novo argumento
+            where=where,
+            join_file=join,
+            join_on=on,
+            only_new=only_new,
+            campaign=campaign,
+            sample_size=sample,
+            stratify=stratify,
+            sample_seed=seed
         )
         
         print("\n✅ Email sending completed!")
@@ -297,5 +317,52 @@ def sync_bounces_command(
         print(f"❌ Erro ao sincronizar bounces: {str(e)}")
         sys.exit(1)
 
+@app.command()
+def import_recipients(
+    db_file: str = typer.Argument(..., help="Banco SQLite de destino (.db, .sqlite ou .sqlite3)"),
+    csv_file: str = typer.Option(None, help="CSV de origem. Padrão: csv_file da configuração"),
+    config_file: str = typer.Option("config/config.yaml", "--config", "-c", help="Caminho para o arquivo de configuração"),
+):
+    """
+    Importa o CSV de destinatários para um banco SQLite com índices de email e status.
+    """
+    try:
+        config = Config(config_file)
+        email_service = EmailService(config)
+        
+        csv_path = csv_file or config.email_config["csv_file"]
+        print(f"Importando {csv_path} para {db_file}...")
+        
+        total = email_service.import_recipients(csv_path, db_file)
+        
+        print(f"✅ {total} destinatários importados. Use {db_file} como csv_file para enviar a partir do banco.")
+    
+    except Exception as e:
+        print(f"❌ Erro ao importar destinatários: {str(e)}")
+        sys.exit(1)
+
+@app.command()
+def export_recipients(
+    db_file: str = typer.Argument(..., help="Banco SQLite de origem"),
+    csv_file: str = typer.Argument(..., help="Arquivo CSV de destino"),
+    config_file: str = typer.Option("config/config.yaml", "--config", "-c", help="Caminho para o arquivo de configuração"),
+):
+    """
+    Exporta um banco SQLite de destinatários para CSV, incluindo as colunas de status.
+    """
+    try:
+        config = Config(config_file)
+        email_service = EmailService(config)
+        
+        print(f"Exportando {db_file} para {csv_file}...")
+        
+        total = email_service.export_recipients(db_file, csv_file)
+        
+        print(f"✅ {total} destinatários exportados para {csv_file}.")
+    
+    except Exception as e:
+        print(f"❌ Erro ao exportar destinatários: {str(e)}")
+        sys.exit(1)
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -82,6 +82,13 @@ def send_emails():
     template = data.get("template")
     skip_unsubscribed_sync = data.get("skip_unsubscribed_sync", False)
     mode = data.get("mode", "test")  # test ou production
+    where = data.get("where")  # segmento opcional, ex.: cidade == "São Paulo"
+    join_file = data.get("join")  # arquivo com colunas extras para o template
+    join_on = data.get("on", "email")
+    only_new = data.get("only_new", False)  # apenas endereços ainda não enviados na campanha
+    campaign = data.get("campaign")
+    sample_size = data.get("sample")  # amostra aleatória de N destinatários
+    stratify = data.get("stratify")
     
     if not template:
         return jsonify({"error": "Template não fornecido"}), 400
@@ -93,7 +100,14 @@ def send_emails():
             csv_file=csv_file,
             template=template,
             skip_unsubscribed_sync=skip_unsubscribed_sync,
-            is_test_mode=(mode == "test")
+            is_test_mode=(mode == "test"),
+            where=where,
+            join_file=join_file,
+            join_on=join_on,
+            only_new=only_new,
+            campaign=campaign,
+            sample_size=sample_size,
+            stratify=stratify
         )
         
         return jsonify({
@@ -102,6 +116,9 @@ def send_emails():
             "report": result
         })
     
+    except ValueError as e:
+        # Expressão --where inválida ou colunas ausentes
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2,6 +2,7 @@ import smtplib
 import csv
 import os
 import logging
+import numpy as np
 import pandas as pd
 import time
 import ssl
@@ -12,32 +13,198 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Union, Any
+from typing import Callable, Iterable, List, Dict, Optional, Tuple, Union, Any, NamedTuple
 from contextlib import contextmanager
-from datetime import datetime
 import signal
 import math
 
 from .config import Config
-from .utils.csv_reader import CSVReader
-from .email_templating import TemplateProcessor
-from .reporting import ReportGenerator
+from .utils.csv_reader import CSVReader, clear_columns, compression_of, detect_separator, is_read_only_input, read_column, read_email_column
+from .utils.parallel_csv import read_csv_parallel
+from .utils.dedupe import streaming_dedupe
+from .utils.address import AddressNormalizer
+from .utils.send_journal import (SendJournal, FlushPolicy, FlagSidecar, journal_path_for, flags_path_for,
+                                 STATUS_FAILED, STATUS_INVALID)
+from .utils.checkpoint import Checkpoint, checkpoint_path_for
+from .utils.backup_manager import BackupManager
+from .utils.recipient_store import SQLiteRecipientStore, is_sqlite_store
+from .utils.recipient_batch import RecipientBatch
+from .utils.segment import Segment
+from .utils.join import JoinTable, NEVER_JOINED, read_join_header
+from .utils.campaign_history import CampaignHistory, DEFAULT_HISTORY_DIR, history_path_for
+from .utils.sampling import email_domain, reservoir_sample
+from .utils.email_validation import EmailValidator
+from .email_templating import TemplateProcessor, DEFAULT_RENDER_CACHE_SIZE
+from .reporting import ReportGenerator, PhaseTimer
 from .smtp_manager import SmtpManager
+from .render_pool import RenderPool
 
 log = logging.getLogger("email_sender")
 
+class SendResult(NamedTuple):
+    """Outcome of one recipient in a sending run (a tuple, much smaller than a dict per recipient)."""
+    email: str
+    status: str
+    tentativas: str
+    detalhes: str
+
 class EmailService:
     def __init__(self, config: Config):
         self.config = config
         # Passa apenas content_config para o TemplateProcessor para garantir compatibilidade
-        self.template_processor = TemplateProcessor(config.content_config if hasattr(config, 'content_config') else config)
+        self.template_processor = TemplateProcessor(
+            config.content_config if hasattr(config, 'content_config') else config,
+            render_cache_size=self.config.email_config.get("render_cache_size", DEFAULT_RENDER_CACHE_SIZE)
+        )
         self.report_generator = ReportGenerator(reports_dir=self.config.email_config.get("reports_dir", "reports"))
-        self.smtp_manager = SmtpManager(config)
+        self.smtp_manager = SmtpManager(config, template_processor=self.template_processor)
+        self.backup_manager = BackupManager(
+            backup_dir=self.config.email_config.get("backup_dir", "backup"),
+            retention=self.config.email_config.get("backup_retention", 5),
+            compress=self.config.email_config.get("backup_compress", True),
+        )
+        # Chave canônica dos endereços (deduplicação, supressões e envio)
+        self.address_normalizer = AddressNormalizer(
+            rules=self.config.email_config.get("address_rules"),
+            enabled=self.config.email_config.get("address_normalization", True),
+        )
+        # Validação de sintaxe e de domínios descartáveis/bloqueados antes do envio
+        self.email_validator = None
+        if self.config.email_config.get("email_validation", True):
+            self.email_validator = EmailValidator(
+                blocked_domains=self.config.email_config.get("blocked_domains"),
+                disposable_domains_file=self.config.email_config.get("disposable_domains_file"),
+            )
+
+    def open_recipients(self, path: str, batch_size: int, usecols: Optional[set] = None,
+                        where: Optional[str] = None, streaming: Optional[bool] = None) -> Union[CSVReader, SQLiteRecipientStore]:
+        """
+        Opens the recipient list: a SQLite store for .db/.sqlite files, a CSVReader otherwise
+        (CSV, Parquet or Arrow). ``usecols`` limits the columns loaded from columnar files
+        and ``where`` restricts the recipients to a segment (see utils.segment.Segment).
+        ``streaming`` overrides the ``streaming_reader`` setting.
+        """
+        # Status de envio ficam em buffer e são gravados ao atingir qualquer um destes limites
+        flush_policy = FlushPolicy(
+            max_records=self.config.email_config.get("status_flush_records", 100),
+            max_bytes=self.config.email_config.get("status_flush_bytes", 65536),
+            interval=self.config.email_config.get("status_flush_interval", 300),
+        )
+        if is_sqlite_store(path):
+            return SQLiteRecipientStore(path, batch_size, flush_policy=flush_policy, where=where)
+        return CSVReader(
+            path,
+            batch_size,
+            streaming=self.config.email_config.get("streaming_reader", False) if streaming is None else streaming,
+            chunk_size=self.config.email_config.get("reader_chunk_size", 50000),
+            usecols=usecols,
+            flush_policy=flush_policy,
+            backup_manager=self.backup_manager,
+            parse_workers=self.config.email_config.get("parse_workers", 0),
+            where=where,
+        )
+
+    def open_join(self, join_file: str, recipients_path: str, on: str = "email",
+                  columns: Optional[Iterable[str]] = None) -> JoinTable:
+        """
+        Builds the hash index used to enrich the recipients of ``recipients_path`` with
+        the columns of ``join_file`` (see utils.join.JoinTable).
+
+        The index is built from the smaller side: when the recipient list is the
+        smaller file, only the rows of ``join_file`` whose key is in the list are kept.
+        Emails are matched by their canonical key (see AddressNormalizer). Requested
+        ``columns`` that ``join_file`` does not have are skipped; the caller checks the
+        template fields against both headers.
+        """
+        if not Path(join_file).exists():
+            raise FileNotFoundError(f"Arquivo de junção não encontrado: {join_file}")
+        if columns is not None:
+            header = set(read_join_header(join_file))
+            columns = [c for c in columns if c in header]
+        key_func = self.address_normalizer.normalize if on == "email" else None
+        keys = None
+        if os.path.getsize(recipients_path) < os.path.getsize(join_file):
+            if is_sqlite_store(recipients_path):
+                store = SQLiteRecipientStore(recipients_path)
+                try:
+                    values = store.values(on)
+                finally:
+                    store.close()
+            else:
+                values = read_column(recipients_path, on)
+            keys = set((key_func or (lambda v: v.fillna("").astype(str).str.strip()))(values).unique())
+        return JoinTable(
+            join_file,
+            on=on,
+            columns=columns,
+            key_func=key_func,
+            keys=keys,
+            chunk_size=self.config.email_config.get("reader_chunk_size", 50000),
+        )
+
+    def sample_recipients(self, csv_file: str, size: int, stratify: Optional[str] = None,
+                          output_file: Optional[str] = None, seed: Optional[int] = None,
+                          where: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Writes a random sample of the pending recipients of ``csv_file`` to ``output_file``
+        (default: ``sample_file`` from the configuration), for seed/test sends.
+
+        The list is read once by the streaming reader and sampled with a reservoir
+        (see utils.sampling.reservoir_sample), so memory does not depend on its size.
+        With ``stratify`` (e.g. 'domain') the sample is spread across that column's values.
+        Status sidecars left by a previous sample are discarded.
+        """
+        output_file = output_file or self.config.email_config.get("sample_file", "data/sample_emails.csv")
+        if Path(output_file).resolve() == Path(csv_file).resolve():
+            raise ValueError("O arquivo da amostra não pode ser a própria lista de destinatários")
+        chunk_size = self.config.email_config.get("reader_chunk_size", 50000)
+        reader = self.open_recipients(csv_file, chunk_size, where=where, streaming=True)
+        try:
+            sample = reservoir_sample(reader.get_batches(as_frames=True), size, stratify=stratify, seed=seed)
+        finally:
+            if isinstance(reader, SQLiteRecipientStore):
+                reader.close()
+            else:
+                reader.cleanup()
+        if sample.empty:
+            sample = pd.DataFrame(columns=reader.columns)
+
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        sample.to_csv(output_file, index=False)
+        # Status de uma amostra anterior não valem para a nova
+        for sidecar in (journal_path_for(output_file), checkpoint_path_for(output_file), flags_path_for(output_file)):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+        log.info(f"Amostra de {len(sample)} destinatários de {csv_file} gravada em {output_file}")
+        strata = None
+        if stratify and not sample.empty:
+            strata = int((sample[stratify] if stratify in sample.columns else email_domain(sample["email"])).nunique())
+        return {
+            "status": "success",
+            "output_file": output_file,
+            "sample_size": len(sample),
+            "strata": strata,
+        }
+
+    def read_recipients_frame(self, csv_file: str, **kwargs: Any) -> pd.DataFrame:
+        """
+        Loads a whole recipients CSV (plain or compressed) into a DataFrame.
+
+        Large files are parsed in parallel by ``parse_workers`` processes; ``kwargs``
+        go to ``pd.read_csv``.
+        """
+        return read_csv_parallel(
+            csv_file,
+            detect_separator(csv_file),
+            compression_of(csv_file),
+            workers=self.config.email_config.get("parse_workers", 0),
+            **kwargs,
+        )
 
     def clear_sent_flags(self, csv_file: str, columns_to_clear: List[str] = ["enviado", "falhou"]) -> Dict[str, Any]:
         """
         Clears specified flag columns in a CSV file.
-        Sets the values in these columns to False.
+        Empties the values in these columns in a single streaming pass (see clear_columns).
         Creates a backup of the original file.
         """
         try:
@@ -46,31 +213,49 @@ class EmailService:
             if not Path(csv_file).exists():
                 raise FileNotFoundError(f"Arquivo {csv_file} não encontrado")
 
+            if is_read_only_input(csv_file):
+                # Parquet/Arrow, CSVs compactados, JSONL e XLSX não são reescritos: os status ficam no journal lateral
+                reader = CSVReader(csv_file, usecols=())
+                reader.clear_sent_flags()
+                return {
+                    "status": "success",
+                    "csv_file": csv_file,
+                    "backup_file": None,
+                    # JSONL/XLSX são lidos só em blocos: a contagem lê apenas a coluna de email
+                    "original_row_count": len(reader.df) if reader.df is not None else len(read_email_column(csv_file)),
+                    "cleared_flags_count": {}
+                }
+
+            if is_sqlite_store(csv_file):
+                store = SQLiteRecipientStore(csv_file)
+                try:
+                    original_row_count = store.count()
+                    cleared_flags_count = store.clear_sent_flags(self._with_invalid_reason(columns_to_clear, store.columns))
+                finally:
+                    store.close()
+                log.info(f"Flags {columns_to_clear} limpas com sucesso em {csv_file}.")
+                return {
+                    "status": "success",
+                    "csv_file": csv_file,
+                    "backup_file": None,
+                    "original_row_count": original_row_count,
+                    "cleared_flags_count": cleared_flags_count
+                }
+
             # Create backup
             backup_file_path = self.create_backup(csv_file)
             log.info(f"Backup do arquivo {csv_file} criado em: {backup_file_path}")
 
+            # Uma única passada em streaming: só as colunas de flag mudam, o resto é copiado como está
             try:
-                df = pd.read_csv(csv_file, sep=None, engine='python', dtype=str) # Read all as string to preserve data
-            except Exception as e:
+                header = list(pd.read_csv(csv_file, sep=detect_separator(csv_file), nrows=0).columns)
+                original_row_count, cleared_flags_count = clear_columns(csv_file, self._with_invalid_reason(columns_to_clear, header))
+            except (csv.Error, UnicodeDecodeError) as e:
                 raise ValueError(f"Erro ao ler o arquivo CSV {csv_file}: {str(e)}")
 
-            original_row_count = len(df)
-            cleared_flags_count = {}
-
-            for col in columns_to_clear:
-                if col in df.columns:
-                    # Count how many flags will be cleared (e.g., were True or non-empty)
-                    # Assuming flags are stored as strings 'True', 'true', '1' or just non-empty
-                    # For simplicity, we'll just clear them to empty string or a specific "False" marker
-                    # If they are boolean, pandas will handle it. If strings, this sets to empty.
-                    cleared_flags_count[col] = df[col].astype(bool).sum() # Example: count previously true flags
-                    df[col] = "" # Set to empty string, or False if column is boolean
-                else:
-                    log.warning(f"Coluna '{col}' não encontrada no arquivo {csv_file}. Nenhuma flag será limpa para esta coluna.")
-                    cleared_flags_count[col] = 0
-            
-            df.to_csv(csv_file, index=False)
+            # Descartar o journal de envio pendente e o checkpoint, senão os status voltariam na próxima leitura
+            SendJournal(journal_path_for(csv_file)).discard()
+            Checkpoint(checkpoint_path_for(csv_file)).discard()
             log.info(f"Flags {columns_to_clear} limpas com sucesso em {csv_file}.")
 
             return {
@@ -86,10 +271,17 @@ class EmailService:
             # Re-raise the exception so the CLI can catch it and report
             raise
 
+    @staticmethod
+    def _with_invalid_reason(columns_to_clear: List[str], available: Iterable[str]) -> List[str]:
+        """O motivo de um endereço inválido só vale junto com a falha: limpar 'falhou' limpa também 'invalido'."""
+        if STATUS_FAILED in columns_to_clear and STATUS_INVALID not in columns_to_clear and STATUS_INVALID in available:
+            return list(columns_to_clear) + [STATUS_INVALID]
+        return list(columns_to_clear)
+
     def load_unsubscribed_emails(self, unsubscribe_file: Optional[str] = None) -> set:
         """
         Carrega emails da lista de descadastro.
-        Retorna um set de emails em lower case.
+        Retorna um set com a chave canônica de cada email (ver AddressNormalizer).
         """
         unsubscribe_path = Path(unsubscribe_file or self.config.email_config.get("unsubscribe_file", "data/descadastros.csv"))
         unsubscribed_emails = set()
@@ -97,7 +289,7 @@ class EmailService:
             try:
                 df_unsubscribed = pd.read_csv(unsubscribe_path, dtype=str)
                 if "email" in df_unsubscribed.columns:
-                    unsubscribed_emails = set(df_unsubscribed["email"].str.lower().dropna().unique())
+                    unsubscribed_emails = self.address_normalizer.key_set(df_unsubscribed["email"].dropna())
                     log.info(f"Carregados {len(unsubscribed_emails)} emails da lista de descadastro: {unsubscribe_path}")
                 else:
                     log.warning(f"Coluna 'email' não encontrada em {unsubscribe_path}. Nenhum email de descadastro carregado.")
@@ -110,7 +302,7 @@ class EmailService:
     def load_bounced_emails(self, bounces_file: Optional[str] = None) -> set:
         """
         Carrega emails da lista de bounces ativos.
-        Retorna um set de emails em lower case.
+        Retorna um set com a chave canônica de cada email (ver AddressNormalizer).
         """
         bounces_path = Path(bounces_file or self.config.email_config.get("bounces_file", "data/bounces.csv"))
         bounced_emails = set()
@@ -118,7 +310,7 @@ class EmailService:
             try:
                 df_bounces = pd.read_csv(bounces_path, dtype=str)
                 if "email" in df_bounces.columns:
-                    bounced_emails = set(df_bounces["email"].str.lower().dropna().unique())
+                    bounced_emails = self.address_normalizer.key_set(df_bounces["email"].dropna())
                     log.info(f"Carregados {len(bounced_emails)} emails da lista de bounces: {bounces_path}")
                 else:
                     log.warning(f"Coluna 'email' não encontrada em {bounces_path}. Nenhum email de bounce carregado.")
@@ -128,6 +320,26 @@ class EmailService:
             log.warning(f"Arquivo de bounces {bounces_path} não encontrado. Nenhum email de bounce carregado.")
         return bounced_emails
 
+    def _emails_matching(self, csv_file: str, keys: set) -> set:
+        """Emails of the list (lowercased, as stored) whose canonical key is in ``keys``."""
+        if is_sqlite_store(csv_file):
+            store = SQLiteRecipientStore(csv_file)
+            try:
+                emails = store.emails()
+            finally:
+                store.close()
+        else:
+            emails = read_email_column(csv_file)
+        emails = emails.dropna()
+        return set(emails[self.address_normalizer.normalize(emails).isin(keys)].str.lower())
+
+    def _set_sidecar_flag(self, csv_file: str, keys: set, column: str) -> int:
+        """
+        Records ``column`` for the recipients of a read-only input (Parquet/Arrow or
+        compressed CSV) in its FlagSidecar, instead of rewriting the file.
+        """
+        return FlagSidecar(flags_path_for(csv_file)).set_flag(self._emails_matching(csv_file, keys), column)
+
     def sync_unsubscribed_emails(self, csv_file: str, unsubscribe_file: Optional[str] = None) -> int:
         """
         Marca emails descadastrados no arquivo CSV principal.
@@ -140,8 +352,22 @@ class EmailService:
             log.info("Nenhum email na lista de descadastro. Nenhuma sincronização necessária.")
             return 0
 
+        if is_read_only_input(csv_file):
+            updated_count = self._set_sidecar_flag(csv_file, unsubscribed_set, "unsubscribed")
+            log.info(f"{updated_count} emails marcados como descadastrados em {flags_path_for(csv_file)}.")
+            return updated_count
+
+        if is_sqlite_store(csv_file):
+            store = SQLiteRecipientStore(csv_file)
+            try:
+                updated_count = store.set_flag(self._emails_matching(csv_file, unsubscribed_set), "unsubscribed")
+            finally:
+                store.close()
+            log.info(f"{updated_count} emails marcados como descadastrados em {csv_file}.")
+            return updated_count
+
         try:
-            df = pd.read_csv(csv_file, dtype=str)
+            df = self.read_recipients_frame(csv_file, dtype=str)
             if "email" not in df.columns:
                 raise ValueError(f"Coluna 'email' não encontrada no arquivo CSV principal {csv_file}")
 
@@ -155,14 +381,13 @@ class EmailService:
             else:
                 df["unsubscribed"] = False
 
-            updated_count = 0
-            for index, row in df.iterrows():
-                if pd.notna(row["email"]):
-                    email_lower = str(row["email"]).lower()
-                    if email_lower in unsubscribed_set:
-                        if not df.at[index, "unsubscribed"]:
-                            df.at[index, "unsubscribed"] = True
-                            updated_count += 1
+            newly_unsubscribed = (
+                df["email"].notna()
+                & self.address_normalizer.normalize(df["email"]).isin(unsubscribed_set)
+                & ~df["unsubscribed"].astype(bool)
+            )
+            df.loc[newly_unsubscribed, "unsubscribed"] = True
+            updated_count = int(newly_unsubscribed.sum())
             
             if updated_count > 0:
                 df.to_csv(csv_file, index=False)
@@ -189,7 +414,6 @@ class EmailService:
         """
         # Configuração do Rich
         from rich.console import Console
-        from rich.progress import Progress, SpinnerColumn, TextColumn
         
         console = Console()
         console.print(f"[bold]Iniciando sincronização de bounces[/bold] para [cyan]{csv_file}[/cyan]")
@@ -199,9 +423,23 @@ class EmailService:
             console.print("[yellow]Nenhum email na lista de bounces. Nenhuma sincronização necessária.[/yellow]")
             return 0
 
+        if is_read_only_input(csv_file):
+            updated_count = self._set_sidecar_flag(csv_file, bounced_set, "bounced")
+            console.print(f"[green]✓[/green] {updated_count} emails marcados como bounced em {flags_path_for(csv_file)}.")
+            return updated_count
+
+        if is_sqlite_store(csv_file):
+            store = SQLiteRecipientStore(csv_file)
+            try:
+                updated_count = store.set_flag(self._emails_matching(csv_file, bounced_set), "bounced")
+            finally:
+                store.close()
+            console.print(f"[green]✓[/green] {updated_count} emails marcados como bounced em {csv_file}.")
+            return updated_count
+
         try:
             with console.status(f"Lendo arquivo CSV {csv_file}...") as status:
-                df = pd.read_csv(csv_file, dtype=str)
+                df = self.read_recipients_frame(csv_file, dtype=str)
                 
             if "email" not in df.columns:
                 console.print(f"[bold red]Erro: Coluna 'email' não encontrada no arquivo CSV principal {csv_file}[/bold red]")
@@ -219,24 +457,14 @@ class EmailService:
                 df["bounced"] = False
                 console.print("Coluna 'bounced' não encontrada. Criando nova coluna.")
 
-            updated_count = 0
-            
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console
-            ) as progress:
-                task = progress.add_task("[green]Sincronizando emails com bounce...", total=len(df))
-                
-                for index, row in df.iterrows():
-                    progress.update(task, advance=1)
-                    
-                    if pd.notna(row["email"]):
-                        email_lower = str(row["email"]).lower()
-                        if email_lower in bounced_set:
-                            if not df.at[index, "bounced"]:
-                                df.at[index, "bounced"] = True
-                                updated_count += 1
+            with console.status("[green]Sincronizando emails com bounce..."):
+                newly_bounced = (
+                    df["email"].notna()
+                    & self.address_normalizer.normalize(df["email"]).isin(bounced_set)
+                    & ~df["bounced"].astype(bool)
+                )
+                df.loc[newly_bounced, "bounced"] = True
+                updated_count = int(newly_bounced.sum())
             
             if updated_count > 0:
                 # Salvar o arquivo atualizado
@@ -301,25 +529,45 @@ class EmailService:
                 log.exception("AttributeError details:")
             raise
 
-    def generate_report(self, start_time: float, end_time: float, total_sent: int, successful: int, failed: int) -> Dict[str, Any]:
+    def generate_report(self, start_time: float, end_time: float, total_sent: int, successful: int, failed: int,
+                        phase_timings: Optional[Dict[str, Dict[str, float]]] = None,
+                        invalid_emails: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """
         Gera um relatório do processo de envio de emails usando ReportGenerator.
         """
         try:
-            return self.report_generator.generate_report(start_time, end_time, total_sent, successful, failed)
+            return self.report_generator.generate_report(start_time, end_time, total_sent, successful, failed, phase_timings,
+                                                         invalid_emails)
         except Exception as e:
             log.error(f"Erro ao gerar relatório via ReportGenerator: {str(e)}")
             raise
 
-    def remove_duplicates(self, csv_file: str, column: str = "email", keep: str = "first", output_file: Optional[str] = None) -> Dict[str, Any]:
+    def remove_duplicates(self, csv_file: str, column: str = "email", keep: str = "first", output_file: Optional[str] = None,
+                          streaming: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Remove linhas que repetem ``column``, mantendo a primeira ou a última ocorrência.
+        
+        Com ``streaming`` (padrão: ``streaming_dedupe`` da configuração) o arquivo não é
+        carregado na memória: as chaves são particionadas em disco (ver streaming_dedupe).
+        """
         try:
             log.info(f"Removendo duplicados do arquivo {csv_file} baseado na coluna '{column}'...")
             
             if not Path(csv_file).exists():
                 raise FileNotFoundError(f"Arquivo {csv_file} não encontrado")
             
+            if is_sqlite_store(csv_file):
+                return self._remove_duplicates_store(csv_file, column, keep, output_file)
+            
+            if streaming is None:
+                streaming = self.config.email_config.get("streaming_dedupe", False)
+            if streaming:
+                return self._remove_duplicates_streaming(csv_file, column, keep, output_file)
+            
+            start = time.perf_counter()
             try:
-                df = pd.read_csv(csv_file, sep=None, engine='python')
+                # Texto puro: o arquivo é regravado e não pode perder zeros à esquerda nem virar float
+                df = self.read_recipients_frame(csv_file, dtype=str, keep_default_na=False)
             except Exception as e:
                 raise ValueError(f"Erro ao ler o arquivo CSV: {str(e)}")
             
@@ -327,26 +575,25 @@ class EmailService:
                 raise ValueError(f"Coluna '{column}' não encontrada no arquivo CSV")
             
             total_antes = len(df)
-            df_without_duplicates = df.drop_duplicates(subset=[column], keep=keep)
+            key_func = self._dedupe_keys(column)
+            keys = df[column] if key_func is None else key_func(df[column])
+            df_without_duplicates = df[~keys.duplicated(keep=keep)]
             total_depois = len(df_without_duplicates)
             duplicados_removidos = total_antes - total_depois
             
             if not output_file:
-                backup_dir = Path("backup")
-                backup_dir.mkdir(exist_ok=True)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_file = backup_dir / f"{Path(csv_file).stem}_{timestamp}.csv"
-                
-                shutil.copy2(csv_file, backup_file)
-                log.info(f"Backup criado em: {backup_file}")
+                backup_file = self.create_backup(csv_file)
                 
                 output_path = csv_file
+                # Um CSV compactado é regravado com a mesma compressão
+                compression = compression_of(csv_file) or 'infer'
             else:
                 output_path = output_file
                 backup_file = None
+                compression = 'infer'
             
-            df_without_duplicates.to_csv(output_path, index=False)
+            df_without_duplicates.to_csv(output_path, index=False, compression=compression)
+            duracao = time.perf_counter() - start
             
             result = {
                 "status": "success",
@@ -354,7 +601,9 @@ class EmailService:
                 "total_depois": total_depois,
                 "duplicados_removidos": duplicados_removidos,
                 "output_file": str(output_path),
-                "backup_file": str(backup_file) if backup_file else None
+                "backup_file": str(backup_file) if backup_file else None,
+                "duracao": round(duracao, 3),
+                "linhas_por_segundo": round(total_antes / duracao) if duracao > 0 else 0
             }
             
             if duplicados_removidos > 0:
@@ -368,6 +617,105 @@ class EmailService:
             log.error(f"Erro ao remover duplicados: {str(e)}")
             raise
 
+    def import_recipients(self, csv_file: str, db_file: str) -> int:
+        """
+        Importa um CSV de destinatários para um banco SQLite (substitui a tabela existente).
+        Retorna o número de registros importados.
+        """
+        chunk_size = self.config.email_config.get("reader_chunk_size", 50000)
+        return SQLiteRecipientStore.import_csv(csv_file, db_file, chunk_size=chunk_size)
+
+    def export_recipients(self, db_file: str, csv_file: str) -> int:
+        """
+        Exporta um banco SQLite de destinatários para CSV no formato atual.
+        Retorna o número de registros exportados.
+        """
+        store = SQLiteRecipientStore(db_file)
+        try:
+            return store.export_csv(csv_file, chunk_size=self.config.email_config.get("reader_chunk_size", 50000))
+        finally:
+            store.close()
+
+    def _dedupe_keys(self, column: str) -> Optional[Callable[[pd.Series], pd.Series]]:
+        """Key function of remove_duplicates: the canonical address for the email column, None (exact values) otherwise."""
+        if column == "email" and self.address_normalizer.enabled:
+            return self.address_normalizer.normalize
+        return None
+
+    def _remove_duplicates_streaming(self, csv_file: str, column: str, keep: str, output_file: Optional[str]) -> Dict[str, Any]:
+        """remove_duplicates without loading the file: external hash partitioning on disk."""
+        if output_file:
+            output_path = output_file
+            backup_file = None
+            output_compression = "infer"
+        else:
+            backup_file = self.create_backup(csv_file)
+            output_path = csv_file
+            output_compression = compression_of(csv_file)
+        
+        stats = streaming_dedupe(
+            csv_file,
+            output_path,
+            column=column,
+            keep=keep,
+            sep=detect_separator(csv_file),
+            compression=compression_of(csv_file),
+            output_compression=output_compression,
+            chunk_size=self.config.email_config.get("reader_chunk_size", 50000),
+            key_func=self._dedupe_keys(column),
+        )
+        
+        if stats.removed > 0:
+            log.info(f"{stats.removed} duplicados removidos com sucesso!")
+        else:
+            log.info(f"Nenhum duplicado encontrado para a coluna '{column}'.")
+        
+        return {
+            "status": "success",
+            "total_antes": stats.total,
+            "total_depois": stats.kept,
+            "duplicados_removidos": stats.removed,
+            "output_file": str(output_path),
+            "backup_file": str(backup_file) if backup_file else None,
+            "duracao": round(stats.seconds, 3),
+            "linhas_por_segundo": round(stats.rows_per_second)
+        }
+
+    def _remove_duplicates_store(self, db_file: str, column: str, keep: str, output_file: Optional[str]) -> Dict[str, Any]:
+        """remove_duplicates for a SQLite recipient store (DELETE with GROUP BY, no full load)."""
+        start = time.perf_counter()
+        if output_file:
+            shutil.copy2(db_file, output_file)
+            output_path = output_file
+            backup_file = None
+        else:
+            backup_file = self.create_backup(db_file)
+            output_path = db_file
+        
+        store = SQLiteRecipientStore(output_path)
+        try:
+            total_antes = store.count()
+            duplicados_removidos = store.remove_duplicates(column, keep, key_func=self._dedupe_keys(column))
+        finally:
+            store.close()
+        duracao = time.perf_counter() - start
+        
+        if duplicados_removidos > 0:
+            log.info(f"{duplicados_removidos} duplicados removidos com sucesso!")
+        else:
+            log.info(f"Nenhum duplicado encontrado para a coluna '{column}'.")
+        
+        return {
+            "status": "success",
+            "total_antes": total_antes,
+            "total_depois": total_antes - duplicados_removidos,
+            "duplicados_removidos": duplicados_removidos,
+            "output_file": str(output_path),
+            "backup_file": backup_file,
+            "duracao": round(duracao, 3),
+            "linhas_por_segundo": round(total_antes / duracao) if duracao > 0 else 0
+        }
+
     def send_test_email(self, recipient: str) -> bool:
         """
         Envia um email de teste para verificar a conexão com o servidor SMTP.
@@ -461,30 +809,36 @@ class EmailService:
         """
         Cria um backup do arquivo especificado.
         
+        Reutiliza o último backup se o arquivo não mudou; senão usa reflink ou uma
+        cópia compactada (ver BackupManager).
+        
         Args:
             file_path: Caminho do arquivo a ser copiado
             
         Returns:
-            Caminho do arquivo de backup criado
+            Caminho do arquivo de backup
         """
         try:
-            backup_dir = Path("backup")
-            backup_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = backup_dir / f"{Path(file_path).stem}_{timestamp}.csv"
-            
-            shutil.copy2(file_path, backup_file)
-            log.info(f"Backup criado em: {backup_file}")
-            
-            return str(backup_file)
+            return self.backup_manager.backup(file_path)
         except Exception as e:
             log.error(f"Erro ao criar backup: {str(e)}")
             raise
 
-    def process_email_sending(self, csv_file: str = None, template: str = "", skip_unsubscribed_sync: bool = False, is_test_mode: bool = True, bounces_file_path: str = "data/bounces.csv") -> Dict[str, Any]:
+    def process_email_sending(self, csv_file: str = None, template: str = "", skip_unsubscribed_sync: bool = False, is_test_mode: bool = True, bounces_file_path: str = "data/bounces.csv", where: Optional[str] = None,
+                              join_file: Optional[str] = None, join_on: str = "email",
+                              only_new: bool = False, campaign: Optional[str] = None,
+                              sample_size: Optional[int] = None, stratify: Optional[str] = None,
+                              sample_seed: Optional[int] = None) -> Dict[str, Any]:
         """
         Processa o envio de emails em lote com base em um arquivo CSV e um template HTML.
+
+        ``where`` limita o envio a um segmento, ex.: ``cidade == "São Paulo" and empresa != ""``.
+        ``join_file`` completa cada destinatário com as colunas de outro arquivo (ex.: exportação
+        do CRM), relacionadas pela coluna ``join_on``.
+        Com ``only_new`` só recebem o email endereços ainda não enviados na campanha ``campaign``
+        (padrão: nome do template); os enviados são adicionados ao histórico ao final.
+        Com ``sample_size`` o envio vai para uma amostra aleatória da lista (por padrão a de
+        produção), opcionalmente estratificada por ``stratify`` (ex.: 'domain'); ver sample_recipients.
         """
         try:
             # Configurar console e formatação Rich
@@ -504,11 +858,18 @@ class EmailService:
             failed = 0
             skipped_unsubscribed = 0
             skipped_bounced = 0
+            skipped_known = 0
+            skipped_duplicates = 0
+            invalid_counts: Dict[str, int] = {}
             total_send_attempts = 0
 
             # Determine the CSV file to use
             if csv_file:
                 actual_csv_file = csv_file
+            elif sample_size:
+                # A amostra é tirada da lista de produção, mesmo no modo de teste
+                actual_csv_file = self.config.email_config.get("csv_file")
+                console.print(f"Amostra da lista de produção: [cyan]{actual_csv_file}[/cyan]")
             elif is_test_mode:
                 actual_csv_file = self.config.email_config.get("test_csv_file", "data/test_emails.csv")
                 console.print(f"Modo de teste: Usando CSV de teste: [cyan]{actual_csv_file}[/cyan]")
@@ -524,6 +885,17 @@ class EmailService:
                 console.print(f"[bold red]Erro: Arquivo CSV especificado não encontrado: {actual_csv_file}[/bold red]")
                 raise FileNotFoundError(f"Arquivo CSV especificado não encontrado: {actual_csv_file}")
 
+            if sample_size:
+                # O envio passa a usar o arquivo da amostra; os status da lista original não são tocados
+                sample_result = self.sample_recipients(actual_csv_file, sample_size, stratify=stratify, seed=sample_seed, where=where)
+                console.print(
+                    f"Amostra de [cyan]{sample_result['sample_size']}[/cyan] destinatários"
+                    + (f" ({sample_result['strata']} valores de '{stratify}')" if sample_result["strata"] is not None else "")
+                    + f" gravada em [cyan]{sample_result['output_file']}[/cyan]"
+                )
+                actual_csv_file = sample_result["output_file"]
+                where = None
+
             pause_duration_after_attempts = self.config.email_config.get("batch_delay", 60)
             retry_attempts_config = self.config.email_config.get("retry_attempts", 3)
             retry_delay_config = self.config.email_config.get("retry_delay", 60)
@@ -549,7 +921,6 @@ class EmailService:
                 log.warning(f"Configured batch_size ({configured_batch_size}) is not positive. Defaulting to 30.")
                 configured_batch_size = 30
             
-            csv_reader = CSVReader(actual_csv_file, configured_batch_size)
             email_subject = self.config.content_config.get("email", {}).get("subject", "Sem assunto")
             console.print(f"Assunto do email: [bold magenta]'{email_subject}'[/bold magenta]")
 
@@ -569,6 +940,56 @@ class EmailService:
                 template_path_obj = template_path_obj.resolve()
                 console.print(f"Template encontrado em: [green]{template_path_obj}[/green]")
 
+            # Formatos colunares carregam apenas os campos usados pelo template e pelo assunto
+            used_fields = (
+                set(self.template_processor.compile_template(template_path_obj).fields)
+                | set(self.template_processor.compile_subject(email_subject).fields)
+            )
+            # Campos levados para a renderização em cada RecipientBatch
+            render_fields = sorted(used_fields)
+            if where:
+                # Segmento validado antes de abrir a lista; suas colunas também precisam ser carregadas
+                used_fields |= Segment(where).columns
+                console.print(f"Segmento: [cyan]{where}[/cyan]")
+            if join_file:
+                # A chave da junção precisa ser carregada mesmo que o template não a use
+                used_fields.add(join_on)
+            csv_reader = self.open_recipients(actual_csv_file, configured_batch_size, usecols=used_fields, where=where)
+            if isinstance(csv_reader, SQLiteRecipientStore):
+                # Só o banco do envio salva os status pendentes em SIGINT/SIGTERM
+                csv_reader.install_signal_handlers()
+
+            # Campos do template que faltam na lista vêm do arquivo de junção, se houver
+            join_table = None
+            if join_file:
+                # Só os campos do template e do assunto ausentes da lista; status nunca vêm da junção
+                list_fields = set(csv_reader.columns)
+                join_columns = [f for f in render_fields if f not in list_fields and f not in NEVER_JOINED]
+                if join_columns:
+                    join_table = self.open_join(join_file, actual_csv_file, on=join_on, columns=join_columns)
+                    console.print(f"Junção: [cyan]{join_file}[/cyan] por [cyan]{join_on}[/cyan] "
+                                  f"({len(join_table)} registros no índice, colunas: {', '.join(join_table.columns) or '-'})")
+                else:
+                    console.print(f"Junção com [cyan]{join_file}[/cyan] ignorada: a lista já tem todos os campos do template")
+
+            # Histórico da campanha: endereços já enviados em execuções anteriores são pulados
+            campaign_history = None
+            sent_keys: List[str] = []
+            if only_new:
+                campaign_name = campaign or template_path_obj.stem
+                campaign_history = CampaignHistory(history_path_for(
+                    campaign_name, self.config.email_config.get("campaign_history_dir", DEFAULT_HISTORY_DIR)
+                ))
+                console.print(f"Somente novos: campanha [cyan]{campaign_name}[/cyan] ({len(campaign_history)} endereços já enviados)")
+
+            # Validar o cabeçalho do CSV uma única vez, antes de iniciar o envio
+            required_fields = self.template_processor.get_required_fields(template_path_obj)
+            available_fields = set(csv_reader.columns) | set(join_table.columns if join_table is not None else ())
+            missing_fields = sorted(required_fields - available_fields)
+            if missing_fields:
+                console.print(f"[bold red]Erro: Colunas exigidas pelo template ausentes no CSV: {', '.join(missing_fields)}[/bold red]")
+                raise ValueError(f"Colunas exigidas pelo template ausentes no CSV {actual_csv_file}: {', '.join(missing_fields)}")
+
             total_records = csv_reader.total_records
             if total_records == 0:
                 console.print(f"[bold yellow]Atenção: Nenhum registro encontrado no arquivo CSV: {actual_csv_file}[/bold yellow]")
@@ -585,6 +1006,8 @@ class EmailService:
             
             # Lista para armazenar resultados de envio para exibir depois
             email_results = []
+            render_pool = None
+            phase_timer = PhaseTimer()
 
             try:
                 class TimeoutException(Exception):
@@ -598,6 +1021,59 @@ class EmailService:
                 total_batches = 0
                 if csv_reader.batch_size > 0:
                     total_batches = math.ceil(csv_reader.total_records / csv_reader.batch_size)
+
+                # Chaves canônicas já enviadas ou na fila nesta execução, para todos os lotes
+                queued_keys: set = set()
+
+                def prepared_batches():
+                    """Classifica cada lote uma única vez e separa os destinatários que serão de fato enviados."""
+                    for batch_frame in csv_reader.get_batches(as_frames=True):
+                        if join_table is not None:
+                            batch_frame = join_table.enrich(batch_frame)
+                        batch_emails = batch_frame['email'].fillna('').astype(str).str.strip()
+                        # Supressões comparadas pela chave canônica (Foo.Bar+x@gmail.com == foobar@gmail.com)
+                        batch_keys = self.address_normalizer.normalize(batch_emails)
+                        sendable_mask = (batch_emails != '') & ~batch_keys.isin(active_bounced_set) & ~batch_keys.isin(unsubscribed)
+                        # Busca binária vetorizada no histórico da campanha (modo somente novos)
+                        batch_known = (campaign_history.contains(batch_keys) if campaign_history is not None
+                                       else np.zeros(len(batch_keys), dtype=bool))
+                        # Endereços inválidos saem do lote com o código do motivo, sem chegar ao SMTP.
+                        # Só são validados os que seriam enviados: supressões e histórico têm prioridade
+                        batch_invalid = pd.Series('', index=batch_emails.index, dtype=object)
+                        candidates = sendable_mask.to_numpy() & ~batch_known
+                        if self.email_validator is not None:
+                            batch_invalid = self.email_validator.reasons(batch_emails).where(candidates, '')
+                        ready = candidates & (batch_invalid == '').to_numpy()
+                        # Mesma chave canônica de uma linha anterior (deste lote ou de um já processado):
+                        # Foo.Bar+x@gmail.com e foobar@gmail.com recebem um único email
+                        ready_keys = batch_keys[ready]
+                        repeated_keys = (ready_keys.duplicated() | ready_keys.isin(queued_keys)).to_numpy()
+                        batch_repeated = np.zeros(len(batch_keys), dtype=bool)
+                        batch_repeated[ready] = repeated_keys
+                        queued_keys.update(ready_keys[~repeated_keys].tolist())
+                        # Só os campos do template e do assunto, como arrays de colunas (category vira valores)
+                        sendable = RecipientBatch(batch_frame[ready & ~batch_repeated], render_fields)
+                        yield (batch_frame, batch_emails.tolist(), batch_keys.tolist(), batch_known.tolist(),
+                               batch_invalid, batch_repeated.tolist(), sendable), sendable
+
+                # Renderização: em processos paralelos (render_workers > 1) ou no próprio processo.
+                # Em ambos os casos os corpos saem na mesma ordem do laço de envio abaixo.
+                render_workers = self.config.email_config.get("render_workers", 1)
+                if render_workers > 1:
+                    render_pool = RenderPool(
+                        self.template_processor.content_config,
+                        template_path_obj,
+                        workers=render_workers,
+                        max_pending=self.config.email_config.get("render_queue_size"),
+                        render_cache_size=self.template_processor.render_cache_size,
+                    )
+                    console.print(f"Renderização paralela: [cyan]{render_workers} processos[/cyan]")
+                    rendered_batches = render_pool.render_batches(prepared_batches())
+                else:
+                    rendered_batches = (
+                        (payload, self.template_processor.render_many(template_path_obj, sendable))
+                        for payload, sendable in prepared_batches()
+                    )
                 
                 with Progress(
                     SpinnerColumn(),
@@ -611,57 +1087,96 @@ class EmailService:
                     
                     processed_in_batch_count = 0 # Counter for actual emails processed in the current batch period
                     
-                    for batch_idx, batch_recipients in enumerate(csv_reader.get_batches()):
-                        if not batch_recipients: # If the batch from CSVReader is empty, skip to next potential batch
+                    for batch_idx, ((batch_frame, batch_emails, batch_keys, batch_known, batch_invalid, batch_repeated, sendable), rendered_bodies) in enumerate(rendered_batches):
+                        if batch_frame.empty: # If the batch from CSVReader is empty, skip to next potential batch
                             log.debug(f"Lote {batch_idx + 1}/{int(total_batches)} estava vazio (todos os destinatários filtrados). Pulando.")
                             continue
 
-                        batch_panel = Text(f"Lote {batch_idx + 1}/{int(total_batches)} - Processando {len(batch_recipients)} destinatários", style="bold blue")
+                        batch_panel = Text(f"Lote {batch_idx + 1}/{int(total_batches)} - Processando {len(batch_frame)} destinatários", style="bold blue")
                         progress.console.print(batch_panel)
                         
                         current_batch_processed_count = 0 # Emails processed in this specific non-empty batch
+                        # Inválidos marcados como falha, com o motivo, de uma vez para o lote inteiro
+                        csv_reader.mark_invalid(batch_frame, batch_invalid)
+                        rendered_bodies = iter(rendered_bodies)
+                        subject_start = time.perf_counter()
+                        rendered_subjects = iter(list(self.template_processor.render_subjects(email_subject, sendable)))
+                        phase_timer.add("subject", time.perf_counter() - subject_start, count=len(sendable))
 
-                        for recipient in batch_recipients:
+                        for recipient_email, recipient_key, recipient_known, recipient_invalid, recipient_repeated in zip(
+                                batch_emails, batch_keys, batch_known, batch_invalid.tolist(), batch_repeated):
                             progress.update(progress_task, advance=1) # Advance based on total_records from CSVReader
-                            recipient_email = recipient.get('email', '').strip()
                             
                             if not recipient_email:
-                                email_results.append({
-                                    'email': 'Missing email',
-                                    'status': '[red]Erro[/red]',
-                                    'tentativas': '0',
-                                    'detalhes': 'Email ausente no CSV'
-                                })
+                                email_results.append(SendResult(
+                                    email='Missing email',
+                                    status='[red]Erro[/red]',
+                                    tentativas='0',
+                                    detalhes='Email ausente no CSV'
+                                ))
                                 failed += 1
                                 continue
                                 
-                            recipient_email_lower = recipient_email.lower()
-
                             # Verificar se o email está na lista de bounces
-                            if recipient_email_lower in active_bounced_set:
-                                email_results.append({
-                                    'email': recipient_email,
-                                    'status': '[yellow]Pulado[/yellow]',
-                                    'tentativas': '0',
-                                    'detalhes': 'Email na lista de bounces'
-                                })
+                            if recipient_key in active_bounced_set:
+                                email_results.append(SendResult(
+                                    email=recipient_email,
+                                    status='[yellow]Pulado[/yellow]',
+                                    tentativas='0',
+                                    detalhes='Email na lista de bounces'
+                                ))
                                 skipped_bounced += 1
                                 continue 
 
                             # Verificar se o email está na lista de descadastros
-                            if recipient_email_lower in unsubscribed:
-                                email_results.append({
-                                    'email': recipient_email,
-                                    'status': '[yellow]Pulado[/yellow]',
-                                    'tentativas': '0',
-                                    'detalhes': 'Email descadastrado'
-                                })
+                            if recipient_key in unsubscribed:
+                                email_results.append(SendResult(
+                                    email=recipient_email,
+                                    status='[yellow]Pulado[/yellow]',
+                                    tentativas='0',
+                                    detalhes='Email descadastrado'
+                                ))
                                 skipped_unsubscribed += 1
                                 continue
+
+                            # Verificar se o email já recebeu esta campanha (modo somente novos)
+                            if recipient_known:
+                                email_results.append(SendResult(
+                                    email=recipient_email,
+                                    status='[yellow]Pulado[/yellow]',
+                                    tentativas='0',
+                                    detalhes='Já enviado nesta campanha'
+                                ))
+                                skipped_known += 1
+                                continue
+
+                            # Endereço recusado na validação (já marcado como falha em mark_invalid)
+                            if recipient_invalid:
+                                email_results.append(SendResult(
+                                    email=recipient_email,
+                                    status='[red]Inválido[/red]',
+                                    tentativas='0',
+                                    detalhes=f'Endereço inválido ({recipient_invalid})'
+                                ))
+                                invalid_counts[recipient_invalid] = invalid_counts.get(recipient_invalid, 0) + 1
+                                continue
+
+                            # Mesmo destinatário de uma linha anterior (chave canônica já enviada ou na fila)
+                            if recipient_repeated:
+                                email_results.append(SendResult(
+                                    email=recipient_email,
+                                    status='[yellow]Pulado[/yellow]',
+                                    tentativas='0',
+                                    detalhes='Endereço repetido na lista'
+                                ))
+                                skipped_duplicates += 1
+                                continue
                             
                             total_send_attempts += 1
                             
                             attempts = 0
+                            html_content = None
+                            recipient_subject = None
                             max_retry_minutes = 5  # Tempo máximo de tentativas em minutos
                             start_retry_time = time.time()
                             max_retry_time = start_retry_time + (max_retry_minutes * 60)
@@ -690,13 +1205,14 @@ class EmailService:
                                 if attempts >= retry_attempts_config and time.time() >= max_retry_time:
                                     progress.console.print(f"[red]❌ Número máximo de tentativas e tempo esgotados para {recipient_email}[/red]")
                                     failed += 1
+                                    csv_reader.mark_as_failed(recipient_email, attempts)
                                     
-                                    email_results.append({
-                                        'email': recipient_email,
-                                        'status': '[red]Falha[/red]',
-                                        'tentativas': f"{attempts} (tempo esgotado)",
-                                        'detalhes': 'Tempo máximo de tentativas esgotado (5 minutos)'
-                                    })
+                                    email_results.append(SendResult(
+                                        email=recipient_email,
+                                        status='[red]Falha[/red]',
+                                        tentativas=f"{attempts} (tempo esgotado)",
+                                        detalhes='Tempo máximo de tentativas esgotado (5 minutos)'
+                                    ))
                                     break
                                 
                                 try:
@@ -709,27 +1225,33 @@ class EmailService:
                                         f"(Tentativa {attempts}/{retry_attempts_config}, "
                                         f"Tempo restante: {tempo_restante:.1f}s)"
                                     )
+                                    if html_content is None:
+                                        recipient_subject = next(rendered_subjects)
+                                        with phase_timer.phase("render"):
+                                            html_content = next(rendered_bodies)
                                     signal.alarm(send_timeout)
                                     
-                                    html_content = self.process_email_template(str(template_path_obj), recipient, email_subject)
-                                    
-                                    self.smtp_manager.send_email(
-                                        to_email=recipient_email,
-                                        subject=email_subject,
-                                        content=html_content,
-                                        is_html=True
-                                    )
+                                    with phase_timer.phase("smtp_send"):
+                                        self.smtp_manager.send_email(
+                                            to_email=recipient_email,
+                                            subject=recipient_subject,
+                                            content=html_content,
+                                            is_html=True
+                                        )
                                     
                                     signal.alarm(0)
                                     progress.console.print(f"[green]✅ Email enviado com sucesso para {recipient_email}[/green]")
                                     successful += 1
+                                    csv_reader.mark_as_sent(recipient_email, attempts)
+                                    if campaign_history is not None:
+                                        sent_keys.append(recipient_key)
                                     
-                                    email_results.append({
-                                        'email': recipient_email,
-                                        'status': '[green]Enviado[/green]',
-                                        'tentativas': str(attempts),
-                                        'detalhes': 'Enviado com sucesso'
-                                    })
+                                    email_results.append(SendResult(
+                                        email=recipient_email,
+                                        status='[green]Enviado[/green]',
+                                        tentativas=str(attempts),
+                                        detalhes='Enviado com sucesso'
+                                    ))
                                     break
                                     
                                 except TimeoutException:
@@ -742,13 +1264,14 @@ class EmailService:
                                     else:
                                         progress.console.print(f"[red]❌ Timeout ao enviar para {recipient_email} - tempo máximo excedido[/red]")
                                         failed += 1
+                                        csv_reader.mark_as_failed(recipient_email, attempts)
                                         
-                                        email_results.append({
-                                            'email': recipient_email,
-                                            'status': '[red]Falha[/red]',
-                                            'tentativas': str(attempts),
-                                            'detalhes': f'Timeout após {send_timeout}s (tempo máximo excedido)'
-                                        })
+                                        email_results.append(SendResult(
+                                            email=recipient_email,
+                                            status='[red]Falha[/red]',
+                                            tentativas=str(attempts),
+                                            detalhes=f'Timeout após {send_timeout}s (tempo máximo excedido)'
+                                        ))
                                         break
                                     
                                 except Exception as e:
@@ -778,12 +1301,13 @@ class EmailService:
                                             progress.console.print(f"[red]❌ Falha ao enviar para {recipient_email}: {str(e)}[/red]")
                                         
                                         failed += 1
-                                        email_results.append({
-                                            'email': recipient_email,
-                                            'status': '[red]Falha[/red]',
-                                            'tentativas': str(attempts),
-                                            'detalhes': str(e)[:50] + ('...' if len(str(e)) > 50 else '')
-                                        })
+                                        csv_reader.mark_as_failed(recipient_email, attempts)
+                                        email_results.append(SendResult(
+                                            email=recipient_email,
+                                            status='[red]Falha[/red]',
+                                            tentativas=str(attempts),
+                                            detalhes=str(e)[:50] + ('...' if len(str(e)) > 50 else '')
+                                        ))
                                         break
                                     else:
                                         progress.console.print(f"[yellow]⚠️ Falha temporária ao enviar para {recipient_email} (Tentativa {attempts}/{retry_attempts_config}): {str(e)}[/yellow]")
@@ -795,6 +1319,9 @@ class EmailService:
                             if recipient_email: # Ensure we count only if there was an email to process
                                 current_batch_processed_count +=1
                         
+                        # Ponto de retomada: o lote inteiro foi tratado
+                        csv_reader.mark_batch_processed(batch_frame)
+                        
                         # NEW PAUSE LOGIC: Pause after processing a non-empty batch, if it's not the last batch and delay is positive
                         # And if actual emails were processed in this batch.
                         if current_batch_processed_count > 0 and total_batches > 0 and batch_idx < total_batches - 1 and pause_duration_after_attempts > 0:
@@ -806,6 +1333,22 @@ class EmailService:
                 console.print("\n[bold yellow]Processo interrompido pelo usuário.[/bold yellow]")
             finally:
                 signal.alarm(0)
+                if render_pool is not None:
+                    render_pool.close()
+                # Gravar no CSV (ou no banco), de uma só vez, os status registrados durante o envio
+                if not csv_reader.merge_journal():
+                    console.print(f"[bold red]Não foi possível atualizar {actual_csv_file}; os status pendentes serão reaplicados na próxima execução[/bold red]")
+                if isinstance(csv_reader, SQLiteRecipientStore):
+                    csv_reader.restore_signal_handlers()
+                if campaign_history is not None and sent_keys:
+                    try:
+                        campaign_history.add(sent_keys)
+                    except Exception as e:
+                        log.error(f"Erro ao gravar o histórico da campanha {campaign_history.path}: {e}")
+                        console.print(f"[bold red]Histórico da campanha não atualizado ({e}); os {len(sent_keys)} enviados nesta execução podem receber o email de novo[/bold red]")
+                flush_stats = csv_reader.flush_stats()
+                if flush_stats["flushes"]:
+                    phase_timer.add("status_flush", flush_stats["total_s"], count=flush_stats["flushes"])
             
             end_time = time.time()
             duration = end_time - start_time
@@ -815,12 +1358,7 @@ class EmailService:
             
             # Mostrar tabela de resultados
             for result in email_results:
-                email_table.add_row(
-                    result['email'],
-                    result['status'],
-                    result['tentativas'],
-                    result['detalhes']
-                )
+                email_table.add_row(*result)
             
             console.print(email_table)
             
@@ -830,9 +1368,9 @@ class EmailService:
             summary_table.add_column("Valor", style="bold")
             
             # Calcular métricas adicionais
-            total_attempts = sum(int(r.get('tentativas', '1').split()[0]) for r in email_results if r.get('tentativas', '').strip() != '')
+            total_attempts = sum(int(r.tentativas.split()[0]) for r in email_results if r.tentativas.strip() != '')
             avg_attempts_per_email = total_attempts / max(1, successful + failed)
-            total_connection_errors = sum(1 for r in email_results if 'tempo' in r.get('detalhes', '').lower() or 'timeout' in r.get('detalhes', '').lower())
+            total_connection_errors = sum(1 for r in email_results if 'tempo' in r.detalhes.lower() or 'timeout' in r.detalhes.lower())
             tempo_total_min = duration / 60
             
             summary_table.add_row("Total de Registros", str(total_records))
@@ -840,19 +1378,37 @@ class EmailService:
             summary_table.add_row("Emails com Falha", f"[red]{failed}[/red]")
             summary_table.add_row("Emails Descadastrados (Pulados)", f"[yellow]{skipped_unsubscribed}[/yellow]")
             summary_table.add_row("Emails com Bounce (Pulados)", f"[yellow]{skipped_bounced}[/yellow]")
+            if campaign_history is not None:
+                summary_table.add_row("Já Enviados na Campanha (Pulados)", f"[yellow]{skipped_known}[/yellow]")
+            summary_table.add_row("Endereços Repetidos (Pulados)", f"[yellow]{skipped_duplicates}[/yellow]")
+            for reason, count in sorted(invalid_counts.items()):
+                summary_table.add_row(f"Endereços Inválidos ({reason})", f"[red]{count}[/red]")
             summary_table.add_row("Total de Tentativas", str(total_attempts))
             summary_table.add_row("Média de Tentativas por Email", f"{avg_attempts_per_email:.2f}")
             summary_table.add_row("Falhas por Erro de Conexão", str(total_connection_errors))
             summary_table.add_row("Tempo Total de Execução", f"{tempo_total_min:.2f} minutos ({duration:.1f}s)")
+            phase_timings = phase_timer.summary()
+            for phase, timing in phase_timings.items():
+                summary_table.add_row(f"Tempo da fase '{phase}'", f"{timing['total_s']:.3f}s ({timing['avg_ms']:.3f} ms/op)")
+            summary_table.add_row(
+                "Gravações de Status",
+                f"{flush_stats['flushes']} ({flush_stats['records_per_flush']} status/gravação, máx. {flush_stats['max_ms']:.1f} ms)"
+            )
             
             console.print(summary_table)
             
             # Gerar relatório usando o report_generator
-            report_data = self.generate_report(start_time, end_time, total_send_attempts, successful, failed)
+            report_data = self.generate_report(start_time, end_time, total_send_attempts, successful, failed, phase_timings,
+                                               invalid_counts)
             
             # Adicionar informações adicionais ao relatório para referência futura
             report_data["skipped_unsubscribed"] = skipped_unsubscribed
             report_data["skipped_bounced"] = skipped_bounced
+            if campaign_history is not None:
+                report_data["skipped_known"] = skipped_known
+            report_data["skipped_duplicates"] = skipped_duplicates
+            report_data["invalid_emails"] = invalid_counts
+            report_data["status_flushes"] = flush_stats
             
             console.print(f"Relatório salvo em: [bold cyan]{report_data.get('report_file', 'N/A')}[/bold cyan]")
             
@@ -1,23 +1,106 @@
 import re
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Set, Tuple, Iterable, Iterator, List, Optional, Callable, Union
+
+from .utils.recipient_batch import RecipientBatch
 
 log = logging.getLogger("email_sender")
 
+# Placeholders no formato {campo} ou {secao.campo}. Blocos CSS ({ color: red; })
+# não casam porque exigem um identificador logo após a chave.
+PLACEHOLDER_PATTERN = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)?)\}')
+
+# Placeholders preenchidos a partir das seções 'urls', 'evento' e 'promocao'
+CONFIG_PLACEHOLDERS = ("unsubscribe_url", "subscribe_url", "link_evento", "data_evento", "cidade", "local", "desconto_paragrafo")
+
+# Qualquer {texto} que sobra depois da substituição da configuração é tratado como
+# campo do destinatário (mantido literalmente se o destinatário não tiver o campo).
+RECIPIENT_FIELD_PATTERN = re.compile(r'\{([^{}]+)\}')
+
+# Valores de atributos que contêm links (href="..." / src='...')
+LINK_ATTRIBUTE_PATTERN = re.compile(r"""\b(?:href|src)\s*=\s*("[^"]*"|'[^']*')""", re.IGNORECASE)
+
+# Tamanho padrão do cache LRU de corpos renderizados (0 desativa)
+DEFAULT_RENDER_CACHE_SIZE = 1024
+
+
+class CompiledTemplate:
+    """
+    A template whose configuration placeholders were already substituted, split into
+    the literal chunks and the recipient fields that sit between them.
+    """
+    __slots__ = ("literals", "slots", "fields", "link_fields", "content_fields")
+
+    def __init__(self, content: str):
+        pieces = RECIPIENT_FIELD_PATTERN.split(content)
+        self.literals: List[str] = pieces[0::2]
+        self.slots: List[str] = pieces[1::2]
+        # Campos referenciados, sem repetição e na ordem em que aparecem
+        self.fields: Tuple[str, ...] = tuple(dict.fromkeys(self.slots))
+
+        # Campos que só aparecem dentro de links (ex.: ?email={email} no descadastro) podem
+        # ser substituídos depois, sobre um corpo já renderizado e compartilhado.
+        link_spans = [match.span(1) for match in LINK_ATTRIBUTE_PATTERN.finditer(content)]
+        outside_links = {
+            match.group(1) for match in RECIPIENT_FIELD_PATTERN.finditer(content)
+            if not any(start <= match.start() < end for start, end in link_spans)
+        }
+        self.link_fields: Tuple[str, ...] = tuple(name for name in self.fields if name not in outside_links)
+        self.content_fields: Tuple[str, ...] = tuple(name for name in self.fields if name in outside_links)
+
+    def render(self, recipient: Dict[str, Any]) -> str:
+        """Renders the template for a single recipient dictionary."""
+        columns = {name: [recipient[name]] for name in self.fields if name in recipient}
+        return next(self.render_columns(columns, 1))
+
+    def render_columns(self, columns: Dict[str, List[Any]], count: int) -> Iterator[str]:
+        """
+        Renders ``count`` recipients straight from column arrays.
+
+        Args:
+            columns: Mapping of field name to a list of values, one per recipient.
+                     Fields absent from the mapping are kept as literal placeholders.
+            count: Number of recipients in the arrays.
+        """
+        literals = self.literals
+        if not self.slots:
+            for _ in range(count):
+                yield literals[0]
+            return
+
+        steps = [(columns.get(name), "{" + name + "}", literal) for name, literal in zip(self.slots, literals[1:])]
+        first = literals[0]
+        for i in range(count):
+            out = [first]
+            for column, placeholder, literal in steps:
+                out.append(placeholder if column is None else str(column[i]))
+                out.append(literal)
+            yield "".join(out)
+
+
 class TemplateProcessor:
     """Processes email templates by substituting placeholders with dynamic content."""
-    def __init__(self, config: Any):
+    def __init__(self, config: Any, render_cache_size: int = DEFAULT_RENDER_CACHE_SIZE):
         """
         Initializes the TemplateProcessor.
 
         Args:
             config: The main configuration object, expected to have a 'content_config'
                    or 'email_config' attribute containing the email content dictionary.
+            render_cache_size: Maximum number of rendered bodies kept by render_many to
+                   reuse across recipients that share every non-link field (0 disables).
         """
         # Tenta obter as configurações de email de diferentes atributos do objeto config
         # Por ordem de prioridade
         self.content_config = {}
+        self._required_fields_cache: Dict[Tuple[str, int], frozenset] = {}
+        self._compiled_cache: Dict[Tuple[str, int], CompiledTemplate] = {}
+        self._subject_cache: Dict[str, CompiledTemplate] = {}
+        self.render_cache_size = render_cache_size
+        self._render_memo: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+        self._render_memo_owner: Optional[Tuple[CompiledTemplate, Any]] = None
         
         # Verifica se há content_config no objeto principal
         content_config_dict = getattr(config, 'content_config', None)
@@ -46,28 +129,54 @@ class TemplateProcessor:
         )
         self.content_config = {}
 
-    def _replace_placeholders(self, html_content: str, recipient: Dict[str, str], urls_config: Dict[str, str]) -> str:
+    def _config_placeholders(self) -> Set[str]:
+        """Returns the placeholder names that are filled from the configuration, not from recipient data."""
+        names = set(CONFIG_PLACEHOLDERS)
+        for key, value in self.content_config.items():
+            if isinstance(value, str):
+                names.add(key)
+            elif isinstance(value, dict):
+                names.update(f"{key}.{sub_key}" for sub_key, sub_value in value.items() if isinstance(sub_value, str))
+        return names
+
+    def get_required_fields(self, template_path: Path) -> Set[str]:
         """
-        Replaces placeholders in the HTML content with recipient and configuration data.
+        Returns the recipient fields a template needs, i.e. the placeholders that are
+        not satisfied by the configuration.
+
+        The placeholder scan is cached per template file and invalidated when the file
+        changes, so it can be called once before a send to validate the CSV header.
+
+        Args:
+            template_path: Path object for the HTML template file.
+
+        Returns:
+            Set of field names that must be present as recipient columns.
+        """
+        template_path = Path(template_path)
+        cache_key = (str(template_path.resolve()), template_path.stat().st_mtime_ns)
+        if cache_key not in self._required_fields_cache:
+            with open(template_path, 'r', encoding='utf-8') as f:
+                placeholders = set(PLACEHOLDER_PATTERN.findall(f.read()))
+            self._required_fields_cache[cache_key] = frozenset(placeholders - self._config_placeholders())
+        return set(self._required_fields_cache[cache_key])
+
+    def _substitute_config(self, html_content: str, urls_config: Dict[str, str]) -> str:
+        """
+        Replaces the placeholders that come from the configuration. The result does not
+        depend on the recipient, so it is computed once per template.
 
         Args:
             html_content: The HTML content as a string.
-            recipient: Dictionary containing recipient-specific data.
             urls_config: Dictionary containing URL configuration.
 
         Returns:
-            The HTML content with placeholders replaced.
+            The HTML content with configuration placeholders replaced.
         """
         # URLs from urls_config (derived from self.content_config.get("urls"))
         html_content = html_content.replace("{unsubscribe_url}", urls_config.get("unsubscribe", ""))
         html_content = html_content.replace("{subscribe_url}", urls_config.get("subscribe", ""))
 
-        # Recipient email (mandatory placeholder)
-        if 'email' in recipient:
-            html_content = html_content.replace("{email}", str(recipient['email']))
-        else:
-            log.debug("Recipient data is missing 'email' field for {email} placeholder.")
-
         # Event specific placeholders from self.content_config
         evento_config = self.content_config.get("evento", {})
         html_content = html_content.replace("{link_evento}", evento_config.get("link", ""))
@@ -94,19 +203,182 @@ class TemplateProcessor:
                     if isinstance(sub_value, str):
                         html_content = html_content.replace(f"{{{key}.{sub_key}}}", sub_value)
 
-        # Substitute remaining placeholders from recipient data
-        remaining_placeholders = re.findall(r'\{([^}]+)\}', html_content)
-        for placeholder in remaining_placeholders:
-            if placeholder in recipient:
-                html_content = html_content.replace(f"{{{placeholder}}}", str(recipient[placeholder]))
+        return html_content
+
+    def _replace_placeholders(self, html_content: str, recipient: Dict[str, str], urls_config: Dict[str, str]) -> str:
+        """
+        Replaces placeholders in the HTML content with recipient and configuration data.
+
+        Args:
+            html_content: The HTML content as a string.
+            recipient: Dictionary containing recipient-specific data.
+            urls_config: Dictionary containing URL configuration.
+
+        Returns:
+            The HTML content with placeholders replaced.
+        """
+        compiled = CompiledTemplate(self._substitute_config(html_content, urls_config))
+        return compiled.render(recipient)
+
+    def compile_template(self, template_path: Path) -> CompiledTemplate:
+        """
+        Loads a template and substitutes every configuration placeholder once, leaving
+        only the recipient fields. The result is cached until the file changes.
+
+        Args:
+            template_path: Path object for the HTML template file.
+
+        Returns:
+            The compiled template.
+        """
+        template_path = Path(template_path)
+        cache_key = (str(template_path.resolve()), template_path.stat().st_mtime_ns)
+        compiled = self._compiled_cache.get(cache_key)
+        if compiled is None:
+            with open(template_path, 'r', encoding='utf-8') as f:
+                html_content = f.read()
+            compiled = CompiledTemplate(self._substitute_config(html_content, self.content_config.get("urls", {})))
+            self._compiled_cache[cache_key] = compiled
+            log.debug(f"Template {template_path} compiled with recipient fields: {list(compiled.fields)}")
+        return compiled
+
+    def compile_subject(self, subject: str) -> CompiledTemplate:
+        """
+        Compiles a subject line with the same engine used for bodies: configuration
+        placeholders are substituted once and the remaining {field} placeholders are
+        filled per recipient. Compiled subjects are cached by their text.
+
+        Args:
+            subject: The subject template, e.g. "Olá {nome}, nos vemos em {cidade}".
+
+        Returns:
+            The compiled subject template.
+        """
+        compiled = self._subject_cache.get(subject)
+        if compiled is None:
+            compiled = CompiledTemplate(self._substitute_config(subject, self.content_config.get("urls", {})))
+            self._subject_cache[subject] = compiled
+        return compiled
+
+    def render_subjects(self, subject: str, recipients: Any) -> Iterator[str]:
+        """
+        Renders a subject line for a batch of recipients, in order.
+
+        Args:
+            subject: The subject template.
+            recipients: A pandas DataFrame or an iterable of recipient dictionaries.
+
+        Yields:
+            The personalized subject for each recipient.
+        """
+        compiled = self.compile_subject(subject)
+        columns, count = _column_arrays(recipients, compiled.fields)
+        return compiled.render_columns(columns, count)
+
+    def _css_inliner(self) -> Tuple[Optional[Callable[[str], str]], Any]:
+        """
+        Resolves the configured CSS file once and returns a function that inlines it
+        into rendered HTML (or None when CSS inlining is not configured/available),
+        together with a key identifying the CSS version in use.
+        """
+        css_file_path_str = self.content_config.get("css_file")
+        if not css_file_path_str:
+            return None, None
+
+        css_path = Path(css_file_path_str)
+        if not css_path.exists():
+            log.warning(f"CSS file not found: {css_path}")
+            return None, None
+
+        try:
+            from premailer import Premailer
+        except ImportError:
+            log.warning("Premailer library not installed. CSS will not be inlined. pip install premailer")
+            return None, None
+
+        with open(css_path, 'r', encoding='utf-8') as css_file:
+            css_content = css_file.read()
+
+        def inline(html_content: str) -> str:
+            try:
+                html_content = Premailer(html_content, css_text=css_content).transform()
+                log.debug(f"CSS inlined successfully from {css_path}")
+            except Exception as e_css:
+                log.error(f"Error inlining CSS from {css_path}: {e_css}")
+            return html_content
+
+        return inline, (str(css_path), css_content)
+
+    def render_many(self, template_path: Union[Path, str], recipients: Any) -> Iterator[str]:
+        """
+        Renders a template for a batch of recipients, yielding one HTML body per recipient
+        in order.
+
+        Everything that does not vary across the batch (template loading, configuration
+        placeholders, URLs, the discount paragraph and the CSS file) is resolved once.
+        Recipient values are read from column arrays: a DataFrame is consumed column by
+        column without converting it to records.
+
+        Bodies are memoized in an LRU keyed on the values of the fields used outside
+        links; fields that only appear inside links are substituted afterwards with a
+        plain string replace, so recipients differing only by e-mail share one render
+        (including CSS inlining).
+
+        Args:
+            template_path: Path to the HTML template file.
+            recipients: A pandas DataFrame or an iterable of recipient dictionaries.
+
+        Yields:
+            The processed HTML content for each recipient.
+        """
+        compiled = self.compile_template(Path(template_path))
+        inline_css, css_key = self._css_inliner()
+        columns, count = _column_arrays(recipients, compiled.fields)
+
+        if self.render_cache_size <= 0:
+            for html_content in compiled.render_columns(columns, count):
+                yield inline_css(html_content) if inline_css else html_content
+            return
+
+        # O cache só vale para o mesmo template compilado e a mesma versão do CSS
+        if self._render_memo_owner != (compiled, css_key):
+            self._render_memo.clear()
+            self._render_memo_owner = (compiled, css_key)
+        memo = self._render_memo
+
+        # Campos ausentes entram na chave como o próprio placeholder, que é o que será renderizado
+        content_columns = [(name, columns.get(name), "{" + name + "}") for name in compiled.content_fields]
+        link_markers = {}
+        link_steps = []
+        for index, name in enumerate(compiled.link_fields):
+            if columns.get(name) is not None:
+                marker = f"__EMAIL_SENDER_LINK_{index}__"
+                link_markers[name] = marker
+                link_steps.append((marker, columns[name]))
+
+        hits = 0
+        for i in range(count):
+            key = tuple(placeholder if column is None else column[i] for _, column, placeholder in content_columns)
+            skeleton = memo.get(key)
+            if skeleton is None:
+                values = {name: column[i] for name, column, _ in content_columns if column is not None}
+                values.update(link_markers)
+                skeleton = compiled.render(values)
+                if inline_css:
+                    skeleton = inline_css(skeleton)
+                memo[key] = skeleton
+                if len(memo) > self.render_cache_size:
+                    memo.popitem(last=False)
             else:
-                known_config_placeholders = ["unsubscribe_url", "subscribe_url", "link_evento", "data_evento", "cidade", "local", "desconto_paragrafo"] \
-                                            + list(self.content_config.keys()) \
-                                            + [f"{k}.{sk}" for k, v in self.content_config.items() if isinstance(v, dict) for sk in v.keys()]
-                if placeholder not in known_config_placeholders and placeholder != "email":
-                    log.debug(f"Placeholder {{{placeholder}}} not found in recipient data or specific config sections.")
+                memo.move_to_end(key)
+                hits += 1
 
-        return html_content
+            html_content = skeleton
+            for marker, column in link_steps:
+                html_content = html_content.replace(marker, str(column[i]))
+            yield html_content
+
+        log.debug(f"render_many: {count} recipients, {hits} served from the render cache")
 
     def process(self, template_path: Path, recipient: Dict[str, str]) -> str:
         """
@@ -120,45 +392,7 @@ class TemplateProcessor:
             The processed HTML content as a string.
         """
         try:
-            with open(template_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-
-            # Get URLs from self.content_config (which should now be the correct email dict)
-            urls_config = self.content_config.get("urls", {})
-            
-            html_content = self._replace_placeholders(html_content, recipient, urls_config)
-
-            css_file_path_str = self.content_config.get("css_file")
-            
-            if css_file_path_str:
-                css_path = Path(css_file_path_str)
-                if css_path.exists():
-                    try:
-                        from premailer import Premailer
-                        with open(css_path, 'r', encoding='utf-8') as css_file:
-                            css_content = css_file.read()
-                        
-                        # Combine HTML with external CSS for premailer
-                        if "<html" not in html_content.lower():
-                            html_with_style = f"<html><head><style>{css_content}</style></head><body>{html_content}</body></html>"
-                        elif "<style>" in html_content.lower() or "</style>" in html_content.lower():
-                            pass
-                        else:
-                            html_with_style = html_content.replace("</head>", f"<style>{css_content}</style></head>", 1)
-                            if "</style>" not in html_with_style:
-                                html_with_style = html_content.replace("<body>", f"<body><style>{css_content}</style>", 1)
-
-                        pm = Premailer(html_content, css_text=css_content)
-                        html_content = pm.transform()
-                        log.debug(f"CSS inlined successfully from {css_path}")
-                    except ImportError:
-                        log.warning("Premailer library not installed. CSS will not be inlined. pip install premailer")
-                    except Exception as e_css:
-                        log.error(f"Error inlining CSS from {css_path}: {e_css}")
-                else:
-                    log.warning(f"CSS file not found: {css_path}")
-            
-            return html_content
+            return next(self.render_many(template_path, [recipient]))
         except FileNotFoundError:
             log.error(f"Template file not found: {template_path}")
             raise
@@ -167,3 +401,19 @@ class TemplateProcessor:
             import traceback
             log.debug(traceback.format_exc())
             raise
+
+
+def _column_arrays(recipients: Any, fields: Iterable[str]) -> Tuple[Dict[str, List[Any]], int]:
+    """
+    Extracts one value list per referenced field from a batch of recipients.
+
+    DataFrames are read column-wise; for dictionaries a field missing from a given
+    recipient is kept as a literal placeholder for that recipient only.
+    """
+    if hasattr(recipients, "columns") and hasattr(recipients, "iloc"):
+        return {name: recipients[name].tolist() for name in fields if name in recipients.columns}, len(recipients)
+    if isinstance(recipients, RecipientBatch):
+        return {name: recipients.tolist(name) for name in fields if name in recipients.fields}, len(recipients)
+
+    rows = recipients if isinstance(recipients, list) else list(recipients)
+    return {name: [row.get(name, "{" + name + "}") for row in rows] for name in fields}, len(rows)
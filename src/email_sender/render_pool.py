@@ -0,0 +1,111 @@
+import logging
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .email_templating import TemplateProcessor, DEFAULT_RENDER_CACHE_SIZE
+from .utils.recipient_batch import RecipientBatch
+
+log = logging.getLogger("email_sender")
+
+# Estado de cada processo worker: um TemplateProcessor já aquecido (template compilado)
+_worker_processor: Optional[TemplateProcessor] = None
+_worker_template: Optional[Path] = None
+
+
+def _init_worker(content_config: Dict[str, Any], template_path: str, render_cache_size: int) -> None:
+    """Initializes a worker process with its own TemplateProcessor and compiled template."""
+    global _worker_processor, _worker_template
+    # Ctrl+C é tratado pelo processo principal (que salva o progresso do CSV);
+    # os workers apenas são encerrados junto com o pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_processor = TemplateProcessor(content_config, render_cache_size=render_cache_size)
+    _worker_template = Path(template_path)
+    _worker_processor.compile_template(_worker_template)
+
+
+def _render_batch(recipients: Any) -> List[str]:
+    """Renders one batch of recipients inside a worker process."""
+    return list(_worker_processor.render_many(_worker_template, recipients))
+
+
+class RenderPool:
+    """
+    Renders email bodies in a pool of worker processes.
+
+    Each worker holds a warmed TemplateProcessor. Batches are submitted ahead of the
+    consumer, up to ``max_pending`` batches in flight, and results come back in
+    submission order, so the SMTP loop always has rendered bodies waiting for it.
+    """
+
+    def __init__(self, content_config: Dict[str, Any], template_path: Path, workers: int, max_pending: Optional[int] = None,
+                 render_cache_size: int = DEFAULT_RENDER_CACHE_SIZE):
+        """
+        Args:
+            content_config: Email content configuration used by TemplateProcessor.
+            template_path: Path to the HTML template file.
+            workers: Number of worker processes.
+            max_pending: Maximum number of batches rendered ahead of the consumer.
+                         Defaults to twice the number of workers.
+            render_cache_size: Size of each worker's rendered-body LRU cache.
+        """
+        self.template_path = Path(template_path)
+        self.workers = workers
+        self.max_pending = max(1, max_pending or workers * 2)
+        # Apenas as colunas referenciadas pelo template são enviadas aos workers
+        self.fields = TemplateProcessor(content_config).compile_template(self.template_path).fields
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(content_config, str(self.template_path), render_cache_size),
+        )
+        log.info(f"Render pool started with {workers} workers (up to {self.max_pending} batches ahead)")
+
+    def _project(self, frame: Any) -> Any:
+        """Keeps only the columns the template references, to reduce pickling cost."""
+        if hasattr(frame, "columns"):
+            projected = frame[[name for name in self.fields if name in frame.columns]]
+            # Uma fatia de coluna category carrega todas as categorias; envia só os valores
+            categorical = [name for name in projected.columns if isinstance(projected[name].dtype, pd.CategoricalDtype)]
+            if categorical:
+                projected = projected.astype({name: object for name in categorical})
+            return projected
+        if isinstance(frame, RecipientBatch):
+            return frame
+        return [{name: row[name] for name in self.fields if name in row} for row in frame]
+
+    def render_batches(self, items: Iterable[Tuple[Any, Any]]) -> Iterator[Tuple[Any, List[str]]]:
+        """
+        Renders batches in parallel, preserving order.
+
+        Args:
+            items: Iterable of ``(payload, recipients)`` pairs. ``recipients`` is a
+                   DataFrame or list of dicts; ``payload`` is passed through untouched.
+
+        Yields:
+            ``(payload, bodies)`` pairs in the same order as ``items``.
+        """
+        pending: Deque[Tuple[Any, Any]] = deque()
+        for payload, recipients in items:
+            pending.append((payload, self._executor.submit(_render_batch, self._project(recipients))))
+            if len(pending) >= self.max_pending:
+                done_payload, future = pending.popleft()
+                yield done_payload, future.result()
+
+        while pending:
+            done_payload, future = pending.popleft()
+            yield done_payload, future.result()
+
+    def close(self) -> None:
+        """Shuts the worker processes down, discarding batches not yet consumed."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "RenderPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
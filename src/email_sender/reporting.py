@@ -1,19 +1,56 @@
 \
 import logging
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional
 
 log = logging.getLogger(__name__)
 
+class PhaseTimer:
+    """Accumulates wall-clock time and call counts per named phase of a sending run."""
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, phase: str, seconds: float, count: int = 1) -> None:
+        """Adds ``seconds`` spent in ``phase`` over ``count`` operations."""
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + count
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as one operation of phase ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns total seconds, operation count and average milliseconds per phase."""
+        return {
+            name: {
+                "total_s": round(total, 6),
+                "count": self.counts[name],
+                "avg_ms": round(total * 1000 / self.counts[name], 3) if self.counts[name] else 0.0,
+            }
+            for name, total in self.totals.items()
+        }
+
 class ReportGenerator:
     def __init__(self, reports_dir: str = "reports"):
         self.reports_dir = Path(reports_dir)
         self.reports_dir.mkdir(exist_ok=True)
 
-    def generate_report(self, start_time: float, end_time: float, total_sent: int, successful: int, failed: int) -> Dict[str, Any]:
+    def generate_report(self, start_time: float, end_time: float, total_sent: int, successful: int, failed: int,
+                        phase_timings: Optional[Dict[str, Dict[str, float]]] = None,
+                        invalid_emails: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """
         Generates a report of the email sending process.
+        ``phase_timings`` is the output of PhaseTimer.summary(), when available, and
+        ``invalid_emails`` the count of addresses rejected before sending, per reason code.
         """
         duration = end_time - start_time
         avg_time = duration / total_sent if total_sent > 0 else 0
@@ -32,6 +69,14 @@ Falhas: {failed}
 Tempo total: {duration:.2f} segundos ({horas}h {minutos}min {segundos}s)
 Tempo médio por email: {avg_time:.2f} segundos
 """
+        if invalid_emails:
+            report_content += "\nEndereços recusados antes do envio:\n"
+            for reason, count in sorted(invalid_emails.items()):
+                report_content += f"  {reason}: {count}\n"
+        if phase_timings:
+            report_content += "\nTempos por fase:\n"
+            for phase, timing in phase_timings.items():
+                report_content += f"  {phase}: {timing['total_s']:.3f}s em {timing['count']} operações ({timing['avg_ms']:.3f} ms/op)\n"
         report_file_name = f"email_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         report_path = self.reports_dir / report_file_name
 
@@ -52,7 +97,8 @@ Tempo médio por email: {avg_time:.2f} segundos
             "total_sent": total_sent,
             "successful": successful,
             "failed": failed,
-            "duracao_formatada": f"{horas}h {minutos}min {segundos}s"
+            "duracao_formatada": f"{horas}h {minutos}min {segundos}s",
+            "phase_timings": phase_timings or {}
         }
 
     def generate_error_report(self, error_message: str) -> Dict[str, Any]:
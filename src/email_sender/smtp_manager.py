@@ -6,15 +6,30 @@ import re
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from contextlib import contextmanager
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 
 from .config import Config # Assuming Config is accessible like this
+from .email_templating import TemplateProcessor
+from .reporting import PhaseTimer
 
 log = logging.getLogger(__name__) # Use module-specific logger
 
 class SmtpManager:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, template_processor: Optional[TemplateProcessor] = None):
+        """
+        Args:
+            config: Application configuration.
+            template_processor: Processor whose compiled-template caches are reused by
+                                send_bulk_emails (the EmailService one); created on first use if None.
+        """
         self.config = config
+        self._template_processor = template_processor
+
+    @property
+    def template_processor(self) -> TemplateProcessor:
+        if self._template_processor is None:
+            self._template_processor = TemplateProcessor(getattr(self.config, "content_config", {}))
+        return self._template_processor
 
     def _extract_email_address(self, sender: str) -> str:
         """Extract email address from sender string format 'Name | Company <email@domain.com>'"""
@@ -137,15 +152,18 @@ class SmtpManager:
             log.error(f"Failed to send email to {to_email}: {str(e)}")
             raise e # Re-raise other exceptions
 
-    def send_bulk_emails(self, recipients_data: List[Dict[str, Any]], subject_template: str, body_template_path: str, template_processor_func) -> Tuple[int, int]:
+    def send_bulk_emails(self, recipients_data: List[Dict[str, Any]], subject_template: str, body_template_path: str, template_processor_func,
+                         phase_timer: Optional[PhaseTimer] = None) -> Tuple[int, int]:
         """
         Sends emails in bulk using a template processor.
         Manages SMTP connection for the batch.
         Args:
             recipients_data: List of dictionaries, each with recipient info (must include 'email').
-            subject_template: The subject line for the email (can have placeholders).
+            subject_template: The subject line for the email (can have placeholders, compiled once
+                              with the same engine as the bodies).
             body_template_path: Path to the HTML body template.
             template_processor_func: A function that takes (template_path, recipient_data, subject) and returns processed HTML.
+            phase_timer: Optional PhaseTimer that receives the 'subject', 'render' and 'smtp_send' timings.
         Returns:
             A tuple (successful_sends, failed_sends)
         """
@@ -158,6 +176,9 @@ class SmtpManager:
         
         log.info(f"Starting bulk email sending to {len(recipients_data)} recipients.")
 
+        timer = phase_timer or PhaseTimer()
+        compiled_subject = self.template_processor.compile_subject(subject_template)
+
         try:
             with self._create_smtp_connection() as smtp:
                 for recipient in recipients_data:
@@ -168,14 +189,13 @@ class SmtpManager:
                         continue
 
                     try:
-                        # Process subject template (simple formatting for now)
-                        processed_subject = subject_template
-                        for key, value in recipient.items():
-                            processed_subject = processed_subject.replace(f"{{{key}}}", str(value))
+                        with timer.phase("subject"):
+                            processed_subject = compiled_subject.render(recipient)
                         
                         # Process body template using the provided processor function
                         # The template_processor_func is expected to handle its own errors and raise if critical
-                        processed_body = template_processor_func(body_template_path, recipient, processed_subject)
+                        with timer.phase("render"):
+                            processed_body = template_processor_func(body_template_path, recipient, processed_subject)
 
                         message = self._create_message(
                             to_email=recipient_email,
@@ -185,25 +205,20 @@ class SmtpManager:
                         )
                         
                         log.debug(f"Attempting to send email to: {recipient_email}")
-                        smtp.send_message(message)
+                        with timer.phase("smtp_send"):
+                            smtp.send_message(message)
                         log.info(f"Successfully sent email to: {recipient_email}")
                         successful_sends += 1
                     
                     except smtplib.SMTPServerDisconnected:
                         log.warning(f"SMTP server disconnected before sending to {recipient_email}. Attempting to resend this email with a new connection.")
                         # This is a critical failure for this specific email in the batch.
-                        # We'll try to resend this one email immediately with a fresh connection.
+                        # We'll try to resend this one email immediately with a fresh connection,
+                        # reusing the message already rendered for this recipient.
                         try:
-                            # Re-process templates and recreate message as they might be stateful or connection dependent
-                            processed_subject_retry = subject_template
-                            for key, value in recipient.items():
-                                processed_subject_retry = processed_subject_retry.replace(f"{{{key}}}", str(value))
-                            processed_body_retry = template_processor_func(body_template_path, recipient, processed_subject_retry)
-                            
-                            message_retry = self._create_message(recipient_email, processed_subject_retry, processed_body_retry, is_html=True)
-                            
                             with self._create_smtp_connection() as new_smtp: # Fresh connection for this one email
-                                new_smtp.send_message(message_retry)
+                                with timer.phase("smtp_send"):
+                                    new_smtp.send_message(message)
                             log.info(f"Successfully resent email to {recipient_email} after server disconnection.")
                             successful_sends += 1
                         except Exception as e_resend:
@@ -218,6 +233,7 @@ class SmtpManager:
                         # Log the error and continue with the next recipient in the batch.
             
             log.info(f"Bulk email sending finished. Successful: {successful_sends}, Failed: {failed_sends}")
+            log.info(f"Bulk email phase timings: {timer.summary()}")
 
         except Exception as e_outer:
             # This catches failure in the initial _create_smtp_connection() or other unexpected errors
@@ -0,0 +1,97 @@
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+import pandas as pd
+
+log = logging.getLogger("email_sender")
+
+# Regras por provedor (domínio já em minúsculas e ASCII):
+#   subaddress: separador de tag removido do usuário ("foo+news" -> "foo")
+#   strip_dots: pontos do usuário são ignorados pelo provedor ("foo.bar" -> "foobar")
+#   domain: domínio canônico, para provedores com mais de um domínio
+DEFAULT_PROVIDER_RULES: Dict[str, Dict[str, Any]] = {
+    "gmail.com": {"subaddress": "+", "strip_dots": True},
+    "googlemail.com": {"subaddress": "+", "strip_dots": True, "domain": "gmail.com"},
+    "outlook.com": {"subaddress": "+"},
+    "hotmail.com": {"subaddress": "+"},
+    "live.com": {"subaddress": "+"},
+    "icloud.com": {"subaddress": "+"},
+    "fastmail.com": {"subaddress": "+"},
+    "protonmail.com": {"subaddress": "+"},
+    "proton.me": {"subaddress": "+"},
+}
+
+# Espaços (inclusive NBSP) e caracteres invisíveis (zero-width, BOM) que aparecem em exportações
+WHITESPACE_PATTERN = "[\\s\u00a0\u200b\u200c\u200d\ufeff]+"
+
+
+class AddressNormalizer:
+    """
+    Builds the canonical key of email addresses, vectorized over pandas Series.
+
+    The key is the address lowercased, without whitespace, with the domain
+    IDNA-encoded (computed once per distinct domain) and with the provider rules
+    applied, so ``Foo.Bar+news@Gmail.com`` and ``foobar@gmail.com`` share a key.
+    The key is used to match recipients, never as the address emails are sent to.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Dict[str, Any]]] = None, enabled: bool = True):
+        """
+        Args:
+            rules: Provider rules merged over DEFAULT_PROVIDER_RULES; an empty rule
+                   (``{"gmail.com": {}}``) disables the default for that domain.
+            enabled: If False, keys are only lowercased and stripped of whitespace.
+        """
+        self.enabled = enabled
+        self.rules = {
+            domain.strip().lower(): dict(rule or {})
+            for domain, rule in {**DEFAULT_PROVIDER_RULES, **(rules or {})}.items()
+        }
+        self._idna_cache: Dict[str, str] = {}
+
+    def _ascii_domain(self, domain: str) -> str:
+        ascii_domain = self._idna_cache.get(domain)
+        if ascii_domain is None:
+            try:
+                ascii_domain = domain.encode("idna").decode("ascii")
+            except UnicodeError:
+                ascii_domain = domain
+            self._idna_cache[domain] = ascii_domain
+        return ascii_domain
+
+    def normalize(self, emails: Iterable[Any]) -> pd.Series:
+        """Canonical keys of ``emails`` (a Series keeps its index); missing values become ''."""
+        emails = emails if isinstance(emails, pd.Series) else pd.Series(list(emails), dtype=object)
+        keys = emails.fillna("").astype(str).str.replace(WHITESPACE_PATTERN, "", regex=True).str.lower()
+        if not self.enabled or keys.empty:
+            return keys
+
+        # Sem '@', rpartition devolve ('', '', valor) e o valor fica como está
+        parts = keys.str.rpartition("@")
+        local, at, domain = parts[0], parts[1], parts[2].str.rstrip(".")
+
+        non_ascii = domain.str.contains(r"[^\x00-\x7f]", regex=True)
+        if non_ascii.any():
+            domain = domain.copy()
+            domain[non_ascii] = domain[non_ascii].map(self._ascii_domain)
+
+        for name in set(domain.unique()) & self.rules.keys():
+            rule = self.rules[name]
+            if not rule:
+                continue
+            mask = domain == name
+            user = local[mask]
+            if rule.get("subaddress"):
+                user = user.str.partition(rule["subaddress"])[0]
+            if rule.get("strip_dots"):
+                user = user.str.replace(".", "", regex=False)
+            local = local.copy()
+            local[mask] = user
+            if rule.get("domain"):
+                domain = domain.copy()
+                domain[mask] = rule["domain"]
+        return local + at + domain
+
+    def key_set(self, emails: Iterable[Any]) -> Set[str]:
+        """Distinct non-empty canonical keys of ``emails`` (e.g. a suppression list)."""
+        return set(self.normalize(emails).unique()) - {""}
@@ -0,0 +1,156 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+log = logging.getLogger("email_sender")
+
+# ioctl do Linux que clona um arquivo compartilhando os blocos (copy-on-write: btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+DEFAULT_BACKUP_DIR = "backup"
+DEFAULT_RETENTION = 5
+
+META_SUFFIX = ".meta.json"
+
+# Arquivos já compactados são copiados sem gzip por cima
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.zst', '.xz')
+
+
+def _reflink(source: str, target: str) -> bool:
+    """Clones ``source`` into ``target`` without copying data; False if the filesystem can't."""
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, target)
+        return True
+    except OSError:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+
+class BackupManager:
+    """
+    Creates and restores backups of recipient files without copying them in full every time.
+
+    For each backup, in order of preference:
+    1. if the file did not change since its latest backup (same size and mtime), that
+       backup is reused;
+    2. a reflink (copy-on-write clone) is made, which is instant and uses no extra
+       space on filesystems that support it;
+    3. otherwise a gzip-compressed copy is streamed (or a plain copy if ``compress``
+       is False or the file is already compressed).
+
+    Only the ``retention`` most recent backups of each file are kept. Hard links are
+    not used: the sync and clear commands rewrite the CSV in place, which would
+    change the backup as well.
+    """
+
+    def __init__(self, backup_dir: str = DEFAULT_BACKUP_DIR, retention: int = DEFAULT_RETENTION, compress: bool = True):
+        self.backup_dir = Path(backup_dir)
+        self.retention = max(1, retention)
+        self.compress = compress
+
+    def _backups_of(self, source: str) -> List[Dict]:
+        """Metadata of the existing backups of ``source``, oldest first."""
+        if not self.backup_dir.exists():
+            return []
+        backups = []
+        for meta_path in self.backup_dir.glob(f"*{META_SUFFIX}"):
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (ValueError, OSError):
+                continue
+            # O nome do backup é relativo à pasta, que pode ser movida junto com ele
+            backup_path = self.backup_dir / meta.get("name", "")
+            if meta.get("source") == source and meta.get("name") and backup_path.exists():
+                meta["path"] = str(backup_path)
+                meta["meta_path"] = str(meta_path)
+                backups.append(meta)
+        return sorted(backups, key=lambda meta: meta.get("created", ""))
+
+    def _target_path(self, source_path: Path, compressed: bool) -> Path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = source_path.suffix or ".csv"
+        target = self.backup_dir / f"{source_path.stem}_{timestamp}{suffix}"
+        counter = 1
+        while target.exists() or Path(f"{target}.gz").exists():
+            target = self.backup_dir / f"{source_path.stem}_{timestamp}_{counter}{suffix}"
+            counter += 1
+        return Path(f"{target}.gz") if compressed else target
+
+    def backup(self, file_path: str) -> str:
+        """
+        Backs up ``file_path``.
+
+        Returns:
+            Path of the backup (possibly an earlier, still identical one).
+        """
+        source = str(Path(file_path).resolve())
+        stat = os.stat(source)
+
+        previous = self._backups_of(source)
+        if previous and previous[-1].get("size") == stat.st_size and previous[-1].get("mtime_ns") == stat.st_mtime_ns:
+            log.info(f"{file_path} unchanged since backup {previous[-1]['path']}; reusing it")
+            return previous[-1]["path"]
+
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        target = self._target_path(Path(source), compressed=False)
+        if _reflink(source, str(target)):
+            mode = "reflink"
+        elif self.compress and Path(source).suffix.lower() not in COMPRESSED_SUFFIXES:
+            target = self._target_path(Path(source), compressed=True)
+            with open(source, "rb") as src, gzip.open(target, "wb", compresslevel=1) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            mode = "gzip"
+        else:
+            shutil.copy2(source, target)
+            mode = "copy"
+
+        with open(f"{target}{META_SUFFIX}", "w", encoding="utf-8") as f:
+            json.dump({
+                "source": source,
+                "name": target.name,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "mode": mode,
+                "created": datetime.now().isoformat(),
+            }, f)
+        log.info(f"Backup created ({mode}): {target}")
+
+        self._apply_retention(source)
+        return str(target)
+
+    def _apply_retention(self, source: str) -> None:
+        backups = self._backups_of(source)
+        for meta in backups[:-self.retention]:
+            try:
+                os.remove(meta["path"])
+                os.remove(meta["meta_path"])
+                log.debug(f"Old backup removed: {meta['path']}")
+            except OSError as e:
+                log.warning(f"Could not remove old backup {meta['path']}: {str(e)}")
+
+    def restore(self, backup_path: str, file_path: str) -> None:
+        """Restores ``file_path`` from a backup made by this manager (atomic replace)."""
+        temp_path = f"{file_path}.restore.tmp"
+        if backup_path.endswith(".gz"):
+            with gzip.open(backup_path, "rb") as src, open(temp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        elif not _reflink(backup_path, temp_path):
+            shutil.copy2(backup_path, temp_path)
+        os.replace(temp_path, file_path)
+        log.info(f"Restored {file_path} from backup: {backup_path}")
@@ -0,0 +1,115 @@
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger("email_sender")
+
+DEFAULT_HISTORY_DIR = "data/campaigns"
+
+# Cabeçalho do arquivo; os digests (uint64 little-endian, ordenados) vêm logo depois
+MAGIC = b"EMLHIST1"
+
+# Chave fixa do hash: os digests gravados precisam ser os mesmos em toda execução
+HASH_KEY = "email-sender-v1."
+
+
+def digest(keys: Union[pd.Series, Iterable[str]]) -> np.ndarray:
+    """64-bit digests of email keys (vectorized; stable across runs)."""
+    keys = keys if isinstance(keys, pd.Series) else pd.Series(list(keys), dtype=object)
+    return pd.util.hash_pandas_object(keys.astype(object), index=False, hash_key=HASH_KEY,
+                                      categorize=False).to_numpy(dtype=np.uint64)
+
+
+def _sorted_unique(hashes: np.ndarray) -> np.ndarray:
+    # np.sort + comparação com o vizinho: bem mais rápido que np.unique para uint64
+    hashes = np.sort(hashes)
+    if len(hashes) > 1:
+        hashes = hashes[np.concatenate(([True], hashes[1:] != hashes[:-1]))]
+    return hashes
+
+
+def history_path_for(campaign: str, history_dir: str = DEFAULT_HISTORY_DIR) -> str:
+    """History file of a campaign; the name is reduced to a safe file name."""
+    name = re.sub(r"[^\w.-]+", "_", campaign.strip()).strip("._") or "campaign"
+    return str(Path(history_dir) / f"{name}.hashes")
+
+
+class CampaignHistory:
+    """
+    Set of the addresses a campaign has already been sent to, kept on disk as a
+    sorted array of 64-bit digests of their canonical keys (8 bytes per address).
+
+    The file is memory-mapped, so a history of millions of addresses is neither
+    parsed nor loaded into memory; membership of a whole batch is one vectorized
+    binary search (``np.searchsorted``). New addresses are merged in with ``add``,
+    which rewrites the file through a temporary file and an atomic replace.
+
+    With 64-bit digests a false match (a new address taken as already sent)
+    has a probability of about n²/2⁶⁵, negligible for lists of a few million.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._hashes = self._load()
+
+    def _load(self) -> np.ndarray:
+        if not Path(self.path).exists() or os.path.getsize(self.path) <= len(MAGIC):
+            return np.empty(0, dtype="<u8")
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a campaign history file")
+        if (os.path.getsize(self.path) - len(MAGIC)) % 8:
+            raise ValueError(f"Campaign history {self.path} is truncated")
+        return np.memmap(self.path, dtype="<u8", mode="r", offset=len(MAGIC))
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def contains(self, keys: Union[pd.Series, Iterable[str]]) -> np.ndarray:
+        """Boolean array: True for each key already in the history."""
+        return self._contains(digest(keys))
+
+    def _contains(self, hashes: np.ndarray) -> np.ndarray:
+        if not len(self._hashes) or not len(hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.minimum(np.searchsorted(self._hashes, hashes), len(self._hashes) - 1)
+        return self._hashes[positions] == hashes
+
+    def add(self, keys: Union[pd.Series, Iterable[str]]) -> int:
+        """
+        Adds ``keys`` to the history (atomic rewrite of the file).
+
+        Returns:
+            Number of keys that were not in the history yet.
+        """
+        hashes = _sorted_unique(digest(keys))
+        new = hashes[~self._contains(hashes)]
+        if not len(new):
+            return 0
+        # Duas sequências já ordenadas: o sort estável (timsort) só as intercala
+        merged = np.concatenate([self._hashes, new]).astype("<u8")
+        merged.sort(kind="stable")
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(MAGIC)
+                merged.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            # O memmap antigo precisa ser solto antes do replace (Windows)
+            self._hashes = merged
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._hashes = self._load()
+        log.info(f"Campaign history {self.path}: {len(new)} addresses added ({len(self._hashes)} total)")
+        return len(new)
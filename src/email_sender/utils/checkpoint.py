@@ -0,0 +1,121 @@
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+log = logging.getLogger("email_sender")
+
+# Distância, em linhas, entre as entradas do índice de offsets
+DEFAULT_STRIDE = 10_000
+
+
+def checkpoint_path_for(csv_path: str) -> str:
+    """Path of the resume checkpoint that belongs to a recipients CSV file."""
+    return f"{csv_path}.checkpoint"
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Checkpoint:
+    """
+    Resume point of a streaming send over a CSV file.
+
+    Stores the number of data rows fully processed (and the email of the last one,
+    to detect edits that shift rows) plus a sparse index of ``(row, byte offset)``
+    pairs. The index is tied to the file's size and mtime; when the file changed it
+    is rebuilt with a memory-mapped newline scan up to the resume row.
+
+    The newline scan assumes records do not contain line breaks inside quoted
+    fields; the offsets recorded while CSVReader rewrites the file have no such limit.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.row = 0
+        self.email = ""
+        self.size = -1
+        self.mtime_ns = -1
+        self.index: List[Tuple[int, int]] = []
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        checkpoint = cls(path)
+        if Path(path).exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                checkpoint.row = int(data.get("row", 0))
+                checkpoint.email = data.get("email", "")
+                checkpoint.size = int(data.get("size", -1))
+                checkpoint.mtime_ns = int(data.get("mtime_ns", -1))
+                checkpoint.index = [(int(r), int(o)) for r, o in data.get("index", [])]
+            except (ValueError, OSError) as e:
+                log.warning(f"Ignoring unreadable checkpoint {path}: {str(e)}")
+                checkpoint = cls(path)
+        return checkpoint
+
+    def save(self) -> None:
+        """Writes the checkpoint atomically."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "row": self.row,
+                "email": self.email,
+                "size": self.size,
+                "mtime_ns": self.mtime_ns,
+                "index": self.index,
+            }, f)
+        os.replace(temp_path, self.path)
+
+    def discard(self) -> None:
+        if Path(self.path).exists():
+            os.remove(self.path)
+            log.debug(f"Checkpoint removed: {self.path}")
+
+    def set_index(self, csv_path: str, index: List[Tuple[int, int]]) -> None:
+        """Replaces the offset index, binding it to the current version of ``csv_path``."""
+        self.size, self.mtime_ns = _file_signature(csv_path)
+        self.index = index
+
+    def index_matches(self, csv_path: str) -> bool:
+        return bool(self.index) and (self.size, self.mtime_ns) == _file_signature(csv_path)
+
+    @staticmethod
+    def scan_offsets(csv_path: str, upto_row: int, stride: int = DEFAULT_STRIDE) -> List[Tuple[int, int]]:
+        """
+        Builds a sparse ``(row, offset)`` index with a memory-mapped newline scan.
+
+        Row 0 is the first data row (right after the header); the scan stops once
+        ``upto_row`` is reached, so only the part of the file before the resume point is read.
+        """
+        index: List[Tuple[int, int]] = []
+        with open(csv_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return index
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = mm.find(b"\n") + 1
+                row = 0
+                while position > 0 and row <= upto_row:
+                    if row % stride == 0:
+                        index.append((row, position))
+                    next_newline = mm.find(b"\n", position)
+                    if next_newline == -1:
+                        break
+                    position = next_newline + 1
+                    row += 1
+        return index
+
+    def seek_point(self, row: int) -> Optional[Tuple[int, int]]:
+        """The last indexed ``(row, offset)`` strictly before ``row``, if any."""
+        best = None
+        for entry in self.index:
+            if entry[0] < row:
+                best = entry
+            else:
+                break
+        return best
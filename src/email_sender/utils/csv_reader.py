@@ -1,83 +1,465 @@
 import pandas as pd
+import bz2
+import csv
+import gzip
+import io
 import logging
-from typing import List, Dict, Generator
+from typing import List, Dict, Generator, Union, Iterator, Optional, Iterable, Tuple
 from pathlib import Path
 import signal
 import sys
-import shutil
 import time
 import os
 from datetime import datetime
 
+from .backup_manager import BackupManager
+from .checkpoint import Checkpoint, checkpoint_path_for
+from .parallel_csv import read_csv_parallel
+from .recipient_batch import RecipientBatch, categorize_low_cardinality
+from .record_readers import iter_record_chunks, read_record_column, read_record_header, record_format_of
+from .segment import Segment
+from .send_journal import SendJournal, FlushPolicy, FlagSidecar, journal_path_for, flags_path_for, STATUS_SENT, STATUS_FAILED, STATUS_INVALID
+
 log = logging.getLogger("email_sender")
 
+# Colunas de status usadas para decidir quem ainda precisa receber o email
+STATUS_COLUMNS = ('enviado', 'falhou', 'descadastro')
+
+# Linhas lidas por vez no modo streaming
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Formatos colunares lidos com pyarrow (projeção de colunas e memory-map)
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+# CSVs compactados lidos como stream (extensão -> compressão do pandas)
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.zst': 'zstd'}
+
+# Assinaturas usadas quando a extensão não indica a compressão
+COMPRESSION_MAGIC = ((b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\x28\xb5\x2f\xfd', 'zstd'))
+
+def is_columnar(file_path: str) -> bool:
+    """True if ``file_path`` is a Parquet or Arrow IPC file."""
+    return Path(file_path).suffix.lower() in PARQUET_SUFFIXES + ARROW_SUFFIXES
+
+def read_columnar(file_path: str, usecols: Optional[Iterable[str]] = None) -> Tuple[List[str], pd.DataFrame]:
+    """
+    Reads a Parquet or Arrow IPC file, loading only ``usecols`` (plus the status columns).
+
+    Returns:
+        The full list of columns in the file and the projected DataFrame.
+    """
+    try:
+        import pyarrow.parquet as pq
+        import pyarrow.feather as feather
+    except ImportError as e:
+        raise ImportError("Reading Parquet/Arrow recipient files requires pyarrow (pip install pyarrow)") from e
+    
+    parquet = Path(file_path).suffix.lower() in PARQUET_SUFFIXES
+    if parquet:
+        header = pq.read_schema(file_path).names
+    else:
+        import pyarrow.ipc as ipc
+        with ipc.open_file(file_path) as source:
+            header = source.schema.names
+    
+    columns = None
+    if usecols is not None:
+        wanted = set(usecols) | {'email'} | set(STATUS_COLUMNS)
+        columns = [c for c in header if c in wanted]
+    
+    if parquet:
+        table = pq.read_table(file_path, columns=columns, memory_map=True)
+    else:
+        table = feather.read_table(file_path, columns=columns, memory_map=True)
+    return list(header), table.to_pandas()
+
+def compression_of(file_path: str) -> Optional[str]:
+    """
+    Compression of a CSV file ('gzip', 'bz2' or 'zstd'), from its extension or magic bytes.
+
+    Returns None for plain files.
+    """
+    compression = COMPRESSION_SUFFIXES.get(Path(file_path).suffix.lower())
+    if compression:
+        return compression
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(4)
+    except OSError:
+        return None
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+def is_read_only_input(file_path: str) -> bool:
+    """
+    True for recipient files that are never rewritten (Parquet/Arrow, compressed CSV,
+    JSON Lines or XLSX).
+
+    Their send statuses stay in the send journal and their sync flags in a FlagSidecar.
+    """
+    return is_columnar(file_path) or record_format_of(file_path) is not None or compression_of(file_path) is not None
+
+def open_text(file_path: str) -> io.TextIOBase:
+    """Opens a (possibly compressed) CSV file as a decompressing text stream."""
+    compression = compression_of(file_path)
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rt', encoding='utf-8')
+    if compression == 'bz2':
+        return bz2.open(file_path, 'rt', encoding='utf-8')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Reading .zst recipient files requires zstandard (pip install zstandard)") from e
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True), encoding='utf-8')
+    return open(file_path, 'r', encoding='utf-8')
+
+def read_column(file_path: str, column: str) -> pd.Series:
+    """Reads only ``column`` of a recipients file (CSV, compressed CSV, Parquet, Arrow, JSON Lines or XLSX)."""
+    if is_columnar(file_path):
+        return read_columnar(file_path, usecols=(column,))[1][column]
+    record_format = record_format_of(file_path)
+    if record_format:
+        return read_record_column(file_path, record_format, column)
+    return pd.read_csv(file_path, sep=detect_separator(file_path), usecols=[column], dtype=str,
+                       compression=compression_of(file_path))[column]
+
+def read_email_column(file_path: str) -> pd.Series:
+    """Reads only the 'email' column of a recipients file (see read_column)."""
+    return read_column(file_path, 'email')
+
+def detect_separator(file_path: str) -> str:
+    """
+    Detecta automaticamente o separador do arquivo CSV (vírgula ou ponto e vírgula).
+    """
+    try:
+        with open_text(file_path) as f:
+            first_line = f.readline().strip()
+            
+        # Verifica se tem mais ponto e vírgula ou vírgula
+        if first_line.count(';') > first_line.count(','):
+            return ';'
+        return ','
+    except Exception:
+        # Em caso de erro, usa vírgula como padrão
+        return ','
+
+def clear_columns(file_path: str, columns: Iterable[str], sep: Optional[str] = None) -> Tuple[int, Dict[str, int]]:
+    """
+    Empties ``columns`` of a plain CSV file in one streaming pass.
+
+    Rows are copied with the csv module to a temporary file, with only the given
+    columns blanked, which then atomically replaces the original; memory use does not
+    depend on the file size. If no value had to be cleared the original is left
+    untouched (same mtime, so its last backup is reused).
+
+    Returns:
+        The number of data rows and the number of non-empty values cleared per
+        column (0 for columns not in the file).
+    """
+    sep = sep or detect_separator(file_path)
+    columns = list(columns)
+    cleared = {column: 0 for column in columns}
+    rows = 0
+    temp_path = f"{file_path}.clear.tmp"
+    try:
+        with open(file_path, 'r', newline='', encoding='utf-8') as src, \
+                open(temp_path, 'w', newline='', encoding='utf-8') as dst:
+            reader = csv.reader(src, delimiter=sep)
+            writer = csv.writer(dst, delimiter=sep, lineterminator='\n')
+            header = next(reader, None)
+            if header is None:
+                return rows, cleared
+            writer.writerow(header)
+            positions = [(header.index(column), column) for column in columns if column in header]
+            for column in columns:
+                if column not in header:
+                    log.warning(f"Column '{column}' not found in {file_path}; nothing to clear")
+            for row in reader:
+                for position, column in positions:
+                    if position < len(row) and row[position]:
+                        row[position] = ''
+                        cleared[column] += 1
+                writer.writerow(row)
+                rows += 1
+            dst.flush()
+            os.fsync(dst.fileno())
+        if any(cleared.values()):
+            os.replace(temp_path, file_path)
+        return rows, cleared
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
 class CSVReader:
-    def __init__(self, file_path: str, batch_size: int = 100):
+    def __init__(self, file_path: str, batch_size: int = 100, streaming: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 usecols: Optional[Iterable[str]] = None, flush_policy: Optional[FlushPolicy] = None,
+                 backup_manager: Optional[BackupManager] = None, parse_workers: int = 1,
+                 where: Optional[str] = None):
+        """
+        Args:
+            file_path: Path to the recipients CSV file.
+            batch_size: Number of recipients per batch yielded by get_batches.
+            streaming: If True, the file is never fully loaded: batches are produced from
+                       chunks of ``chunk_size`` rows and memory use does not depend on the
+                       file size.
+            chunk_size: Rows read per chunk in streaming mode.
+            usecols: For Parquet/Arrow files, the columns to load (the status columns
+                     and 'email' are always loaded). None loads every column.
+            flush_policy: When buffered status changes are written to the send journal.
+                          Defaults to 100 changes, 64 KiB or ``save_interval`` seconds.
+            backup_manager: Where and how the CSV is backed up before it is rewritten.
+                            Defaults to ``BackupManager()`` (``backup/`` folder).
+            parse_workers: Processes used to parse a large CSV when it is fully loaded
+                           (0 = every core, 1 = single-threaded). See read_csv_parallel.
+            where: Segment expression (e.g. ``cidade == "São Paulo"``); only the rows it
+                   selects are counted and yielded. See utils.segment.Segment.
+
+        Parquet (.parquet) and Arrow IPC (.arrow/.feather) files are read column-projected
+        and memory-mapped. Compressed CSVs (.gz, .bz2, .zst, or detected by magic bytes)
+        are decompressed as a stream. JSON Lines (.jsonl/.ndjson) and XLSX files are always
+        read in streaming mode, one record at a time (see record_readers). None of these
+        is ever rewritten: their send journal is kept as a sidecar file and replayed on
+        every open, and the flags set by the unsubscribe/bounce syncs are read from a
+        FlagSidecar.
+
+        In streaming mode over an uncompressed CSV, ``mark_batch_processed`` records a checkpoint (row number and
+        byte offset index) so that a resumed run seeks straight to the remaining rows
+        instead of reparsing the whole file.
+
+        Status changes are appended to a send journal (``<file>.journal``) and merged
+        back into the CSV by ``merge_journal``. A journal left by an interrupted run is
+        replayed when the file is opened, so already-sent recipients are skipped.
+        """
         self.file_path = file_path
         self.batch_size = batch_size
-        self.backup_path = f"{file_path}.bak"
+        self.columnar = is_columnar(file_path)
+        self.record_format = None if self.columnar else record_format_of(file_path)
+        self.compression = None if self.columnar or self.record_format else compression_of(file_path)
+        # Entradas somente leitura: status no journal lateral, flags no FlagSidecar
+        self.read_only = self.columnar or self.record_format is not None or self.compression is not None
+        self._flags: Dict[str, Dict[str, str]] = FlagSidecar(flags_path_for(file_path)).read() if self.read_only else {}
+        self._flag_columns = sorted({column for flags in self._flags.values() for column in flags})
+        # Arquivos colunares são carregados já projetados, sem leitura em blocos;
+        # JSON Lines e XLSX são sempre lidos em blocos, sem carregar o arquivo inteiro
+        self.streaming = (streaming or self.record_format is not None) and not self.columnar
+        self.chunk_size = chunk_size
+        self.df = None
+        self._header: List[str] = []
+        self._total_records_cache = None
+        self.segment = Segment(where) if where else None
+        # Máscara do segmento sobre self.df, reaproveitada entre contagens e get_batches
+        self._segment_mask: Optional[pd.Series] = None
+        self._journaled: Dict[str, Dict[str, str]] = {}
+        # Índice email normalizado -> posição da linha (e, para emails repetidos, todas as posições)
+        self._email_positions: Dict[str, int] = {}
+        self._duplicate_positions: Dict[str, List[int]] = {}
+        self.checkpoint = Checkpoint(checkpoint_path_for(file_path))
+        # (linha, offset em bytes) onde a leitura em streaming começa
+        self._start: Optional[Tuple[int, int]] = None
+        self.backup_manager = backup_manager or BackupManager()
+        self.backup_path: Optional[str] = None
         self.last_save = time.time()
         self.save_interval = 300  # Save every 5 minutes
+        self.journal = SendJournal(journal_path_for(file_path), flush_policy or FlushPolicy(interval=self.save_interval))
         
         if not Path(file_path).exists():
             raise FileNotFoundError(f"CSV file not found: {file_path}")
             
-        # Criar backup da planilha antes de começar
-        try:
-            shutil.copy2(file_path, self.backup_path)
-            log.info(f"Backup created: {self.backup_path}")
-        except Exception as e:
-            log.error(f"Failed to create backup: {str(e)}")
-            raise
+        # Criar backup da planilha antes de começar (entradas somente leitura nunca são reescritas)
+        if not self.read_only:
+            try:
+                self.backup_path = self.backup_manager.backup(file_path)
+            except Exception as e:
+                log.error(f"Failed to create backup: {str(e)}")
+                raise
         
         try:
             # Detectar o separador do CSV (vírgula ou ponto e vírgula)
-            separator = self._detect_separator(file_path)
+            separator = ',' if self.columnar or self.record_format else self._detect_separator(file_path)
             self.separator = separator
             
-            self.df = pd.read_csv(file_path, sep=separator)
-            
-            if 'email' not in self.df.columns:
-                raise ValueError("CSV file must contain an 'email' column")
-                
-            if 'enviado' not in self.df.columns:
-                self.df['enviado'] = ''
-            else:
-                self.df['enviado'] = self.df['enviado'].fillna('')
-                
-            if 'falhou' not in self.df.columns:
-                self.df['falhou'] = ''
+            if self.columnar:
+                self._header, df = read_columnar(file_path, usecols)
+                self.df = self._compact(self._apply_flags(self._prepare_frame(df)))
+            elif self.streaming:
+                # Apenas o cabeçalho é lido agora; as linhas são lidas sob demanda
+                if self.record_format:
+                    self._header = read_record_header(file_path, self.record_format)
+                else:
+                    self._header = list(pd.read_csv(file_path, sep=separator, nrows=0, compression=self.compression).columns)
+                if 'email' not in self._header:
+                    raise ValueError("CSV file must contain an 'email' column")
             else:
-                self.df['falhou'] = self.df['falhou'].fillna('')
-                
-            # Convertendo emails para minúsculas apenas onde enviado está vazio
-            mask = self.df['enviado'] == ''
-            self.df.loc[mask, 'email'] = self.df['email'].str.lower()
+                # Texto puro, como no modo streaming: o DataFrame é regravado no próprio CSV
+                df = read_csv_parallel(file_path, separator, self.compression, workers=parse_workers,
+                                       dtype=str, keep_default_na=False)
+                self._header = list(df.columns)
+                self.df = self._compact(self._apply_flags(self._prepare_frame(df)))
+            
+            # Reaplicar o journal de uma execução anterior que não chegou a ser mesclado
+            if self.journal.exists():
+                self._journaled = self.journal.read()
+                log.info(f"Replaying send journal {self.journal.path} ({len(self._journaled)} recipients)")
+                if self.df is not None:
+                    self._apply_statuses(self.df, self._journaled)
+            
+            if self.segment is not None:
+                missing = sorted(self.segment.columns - set(self.columns))
+                if missing:
+                    raise ValueError(f"Columns used by the segment not found in CSV file: {', '.join(missing)}")
+            
+            if self.df is not None:
+                self._build_email_index()
+            elif self.streaming and not self.read_only:
+                # Um stream compactado (ou JSONL/XLSX) não permite seek: a retomada usa só o journal
+                self.checkpoint = Checkpoint.load(self.checkpoint.path)
+                self._start = self._resume_position()
             
         except Exception as e:
             log.error(f"Error loading CSV file {file_path}: {str(e)}")
-            if os.path.exists(self.backup_path):
-                os.remove(self.backup_path)  # Clean up backup on initialization failure
             raise
             
         # Registrar handler para SIGINT depois de tudo configurado
         self._setup_signal_handlers()
 
-    def _detect_separator(self, file_path: str) -> str:
+    @staticmethod
+    def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Validates the columns and normalizes the status and email columns of a frame."""
+        if 'email' not in df.columns:
+            raise ValueError("CSV file must contain an 'email' column")
+            
+        if 'enviado' not in df.columns:
+            df['enviado'] = ''
+        else:
+            df['enviado'] = df['enviado'].fillna('')
+            
+        if 'falhou' not in df.columns:
+            df['falhou'] = ''
+        else:
+            df['falhou'] = df['falhou'].fillna('')
+            
+        # Convertendo emails para minúsculas apenas onde enviado está vazio
+        mask = df['enviado'] == ''
+        df.loc[mask, 'email'] = df['email'].str.lower()
+        return df
+
+    @staticmethod
+    def _compact(df: pd.DataFrame) -> pd.DataFrame:
+        """Stores low-cardinality columns as categories; email and status columns stay editable."""
+        return categorize_low_cardinality(df, exclude=('email',) + STATUS_COLUMNS)
+
+    @staticmethod
+    def _apply_statuses(df: pd.DataFrame, statuses: Dict[str, Dict[str, str]],
+                        columns: Iterable[str] = (STATUS_SENT, STATUS_FAILED, STATUS_INVALID),
+                        matched: Optional[set] = None) -> pd.DataFrame:
         """
-        Detecta automaticamente o separador do arquivo CSV (vírgula ou ponto e vírgula).
+        Sets ``columns`` of ``df`` from a replayed send journal (or a FlagSidecar).
+        The keys found in ``df`` are added to ``matched``, when given.
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                first_line = f.readline().strip()
-                
-            # Verifica se tem mais ponto e vírgula ou vírgula
-            if first_line.count(';') > first_line.count(','):
-                return ';'
-            return ','
-        except Exception:
-            # Em caso de erro, usa vírgula como padrão
-            return ','
+        if not statuses or df.empty:
+            return df
+        # Mesma chave do journal, de _rows_for e do checkpoint: endereço sem espaços, em minúsculas
+        emails = df['email'].astype(str).str.strip().str.lower()
+        if matched is not None:
+            matched.update(emails[emails.isin(statuses.keys())].unique())
+        for column in columns:
+            marked = {email: flags[column] for email, flags in statuses.items() if column in flags}
+            # Decidido pelo journal inteiro, não pelo bloco: todos os blocos reescritos têm as mesmas colunas
+            if marked:
+                if column not in df.columns:
+                    df[column] = ''
+                hits = emails.isin(marked.keys())
+                df.loc[hits, column] = emails[hits].map(marked)
+        return df
+
+    def _apply_flags(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Adds the sync flags of a read-only input; columns named in the sidecar always exist."""
+        for column in self._flag_columns:
+            if column not in df.columns:
+                df[column] = ''
+        return self._apply_statuses(df, self._flags, self._flag_columns)
+
+    def _iter_chunks(self, usecols: Optional[List[str]] = None, start: Optional[Tuple[int, int]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Reads the file in chunks of ``chunk_size`` rows (streaming mode).
+
+        With ``start=(row, offset)`` reading begins at that byte offset, and the chunk
+        index still holds the row numbers of the whole file.
+        """
+        if self.record_format:
+            # Colunas fixas (o cabeçalho já lido) em todos os blocos, sem reler o arquivo
+            yield from iter_record_chunks(self.file_path, self.record_format, self.chunk_size,
+                                          usecols if usecols is not None else self._header)
+            return
+        if start is None:
+            reader = pd.read_csv(
+                self.file_path,
+                sep=self.separator,
+                dtype=str,
+                keep_default_na=False,
+                usecols=usecols,
+                chunksize=self.chunk_size,
+                compression=self.compression,
+            )
+            with reader:
+                yield from reader
+            return
+        
+        first_row, offset = start
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            reader = pd.read_csv(
+                f,
+                sep=self.separator,
+                names=self._header,
+                header=None,
+                dtype=str,
+                keep_default_na=False,
+                usecols=usecols,
+                chunksize=self.chunk_size,
+            )
+            with reader:
+                for chunk in reader:
+                    chunk.index += first_row
+                    yield chunk
+
+    def _resume_position(self) -> Optional[Tuple[int, int]]:
+        """
+        Finds where a resumed streaming run can start reading, from the checkpoint.
+
+        Returns None (read from the beginning) if there is no checkpoint or if the row
+        it points to no longer holds the same recipient.
+        """
+        checkpoint = self.checkpoint
+        if checkpoint.row <= 0:
+            return None
+        if not checkpoint.index_matches(self.file_path):
+            checkpoint.set_index(self.file_path, Checkpoint.scan_offsets(self.file_path, checkpoint.row))
+            checkpoint.save()
+        point = checkpoint.seek_point(checkpoint.row)
+        if point is None:
+            return None
+        
+        # Conferir se a última linha processada ainda é o mesmo destinatário
+        first_row, offset = point
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            rows = pd.read_csv(f, sep=self.separator, names=self._header, header=None, dtype=str,
+                               keep_default_na=False, usecols=['email'], nrows=checkpoint.row - first_row)
+        if len(rows) < checkpoint.row - first_row or rows['email'].iloc[-1].strip().lower() != checkpoint.email:
+            log.warning(f"Checkpoint {checkpoint.path} does not match {self.file_path} anymore; reading the whole file")
+            checkpoint.row, checkpoint.email = 0, ""
+            return None
+        
+        log.info(f"Resuming {self.file_path} near row {checkpoint.row} (byte offset {offset})")
+        return point
+
+    def _detect_separator(self, file_path: str) -> str:
+        return detect_separator(file_path)
 
     def _atomic_save(self, temp_path: str, final_path: str):
         """Salva o arquivo de forma atômica usando rename"""
@@ -99,37 +481,22 @@ class CSVReader:
             self._restore_backup()  # Restore backup on save failure
             return False  # Return False instead of raising
 
-    def _should_save(self) -> bool:
-        """Check if it's time to save based on the interval"""
-        current_time = time.time()
-        if current_time - self.last_save >= self.save_interval:
-            self.last_save = current_time
-            return True
-        return False
-
-    def _periodic_save(self):
-        """Save the spreadsheet periodically"""
-        if self._should_save():
-            temp_path = f"{self.file_path}.temp.csv"
-            if self._atomic_save(temp_path, self.file_path):
-                log.debug(f"Auto-saved at {datetime.now().strftime('%H:%M:%S')}")
-
     def _setup_signal_handlers(self):
         """Configure signal handlers for graceful shutdown"""
         def signal_handler(signum, frame):
-            if signum == signal.SIGINT:
-                log.warning("\nReceived SIGINT (Ctrl+C). Saving changes and restoring if needed...")
+            if signum in (signal.SIGINT, signal.SIGTERM):
+                log.warning(f"\nReceived {signal.Signals(signum).name}. Saving changes and restoring if needed...")
                 self._safe_shutdown()
                 sys.exit(1)
         
         signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
 
     def _safe_shutdown(self):
         """Ensure safe shutdown and data preservation"""
         try:
-            if hasattr(self, 'df'):
-                temp_path = f"{self.file_path}.temp.csv"
-                if self._atomic_save(temp_path, self.file_path):
+            if self.streaming or self.df is not None:
+                if self.merge_journal():
                     log.info("Changes saved successfully before exit")
                 else:
                     self._restore_backup()
@@ -140,38 +507,74 @@ class CSVReader:
             self._restore_backup()
 
     def _restore_backup(self):
-        """Restaura o backup se algo der errado e limpa arquivos"""
+        """Restaura o backup se algo der errado (o backup é mantido, conforme a retenção)"""
         try:
-            if os.path.exists(self.backup_path):
-                if os.path.exists(self.file_path):
-                    os.remove(self.file_path)
-                shutil.copy2(self.backup_path, self.file_path)
-                os.remove(self.backup_path)
-                log.info(f"Restored from backup: {self.backup_path}")
+            if self.backup_path and os.path.exists(self.backup_path):
+                self.backup_manager.restore(self.backup_path, self.file_path)
         except Exception as e:
             log.error(f"Failed to restore backup: {str(e)}")
             raise
 
     def cleanup(self):
-        """Cleanup backup file"""
-        try:
-            if os.path.exists(self.backup_path):
-                os.remove(self.backup_path)
-                log.debug("Backup file removed")
-        except Exception as e:
-            log.error(f"Error removing backup file: {str(e)})")
-            raise  # Re-raise the exception to ensure test failure
+        """Forget the backup; old backups are pruned by the BackupManager retention policy"""
+        self.backup_path = None
 
-    def get_batches(self) -> Generator[List[Dict], None, None]:
+    @staticmethod
+    def _pending_mask(df: pd.DataFrame) -> pd.Series:
+        """Rows still to be sent: not sent, not failed and not unsubscribed."""
+        filter_conditions = (df['enviado'] == '') & (df['falhou'] != 'ok')
+        
+        # Adiciona filtro de descadastro se a coluna existir
+        if 'descadastro' in df.columns:
+            filter_conditions = filter_conditions & (df['descadastro'] != 'S')
+        return filter_conditions
+
+    def _selected_mask(self, df: pd.DataFrame) -> pd.Series:
+        """Pending rows of ``df`` that are also in the segment (if any)."""
+        pending = self._pending_mask(df)
+        if self.segment is None:
+            return pending
+        if df is not self.df:
+            return pending & self.segment.mask(df)
+        # A máscara de self.df não muda durante o envio, a menos que o filtro use colunas de status
+        if self._segment_mask is None or self.segment.columns & set(STATUS_COLUMNS):
+            self._segment_mask = self.segment.mask(df)
+        return pending & self._segment_mask
+
+    def _stream_batches(self) -> Generator[pd.DataFrame, None, None]:
+        """Filters pending rows chunk by chunk and regroups them into batches of batch_size."""
+        carry = None
+        for chunk in self._iter_chunks(start=self._start):
+            chunk = self._apply_statuses(self._apply_flags(self._prepare_frame(chunk)), self._journaled)
+            # Linhas entre o ponto do índice e o checkpoint já foram processadas
+            pending = chunk[self._selected_mask(chunk) & (chunk.index >= self.checkpoint.row)]
+            if carry is not None and len(carry):
+                pending = pd.concat([carry, pending])
+            complete = len(pending) - len(pending) % self.batch_size
+            for i in range(0, complete, self.batch_size):
+                yield pending.iloc[i:i + self.batch_size]
+            carry = pending.iloc[complete:]
+        if carry is not None and len(carry):
+            yield carry
+
+    def get_batches(self, as_frames: bool = False, fields: Optional[Iterable[str]] = None) -> Generator[Union[RecipientBatch, pd.DataFrame], None, None]:
+        """
+        Yields the pending recipients in batches of ``batch_size``.
+
+        Args:
+            as_frames: If True, yields DataFrame slices, so consumers can work column-wise.
+                       Otherwise yields RecipientBatch objects (column arrays with
+                       dict-like records) instead of a dict per recipient.
+            fields: Columns kept in each RecipientBatch. None keeps every column.
+        """
         try:
-            # Filtra emails onde enviado está vazio, não estão marcados como falha E não estão descadastrados
-            filter_conditions = (self.df['enviado'] == '') & (self.df['falhou'] != 'ok')
+            if self.streaming:
+                for batch in self._stream_batches():
+                    yield batch if as_frames else RecipientBatch(batch, fields)
+                return
             
-            # Adiciona filtro de descadastro se a coluna existir
-            if 'descadastro' in self.df.columns:
-                filter_conditions = filter_conditions & (self.df['descadastro'] != 'S')
-                
-            df_to_send = self.df[filter_conditions]
+            # Filtra emails onde enviado está vazio, não estão marcados como falha E não estão descadastrados
+            df_to_send = self.df[self._selected_mask(self.df)]
             
             total_rows = len(df_to_send)
             if (total_rows == 0):
@@ -184,64 +587,229 @@ class CSVReader:
                 # Adicionar log para descadastrados se a coluna existir
                 if 'descadastro' in self.df.columns:
                     log.info(f"Unsubscribed: {len(self.df[self.df['descadastro'] == 'S'])}")
+                if self.segment is not None:
+                    log.info(f"Pending outside segment '{self.segment.expression}': "
+                             f"{int(self._pending_mask(self.df).sum())}")
                 
             # Otimização: processamento em lotes para melhor performance
             for i in range(0, total_rows, self.batch_size):
-                batch = df_to_send.iloc[i:i + self.batch_size].to_dict('records')
-                yield batch
+                batch = df_to_send.iloc[i:i + self.batch_size]
+                yield batch if as_frames else RecipientBatch(batch, fields)
                 
         except Exception as e:
             log.error(f"Error getting batch of emails: {str(e)}")
             raise
 
+    @property
+    def columns(self) -> List[str]:
+        """Column names available for each recipient."""
+        if self.streaming or self.columnar:
+            extra = ['enviado', 'falhou'] + self._flag_columns
+            return self._header + [c for c in dict.fromkeys(extra) if c not in self._header]
+        return list(self.df.columns)
+
+    def _count_pending(self) -> int:
+        """Fast counting pre-pass for streaming mode: reads only the status and segment columns."""
+        status_columns = [c for c in STATUS_COLUMNS if c in self._header]
+        segment_columns = sorted(self.segment.columns & set(self._header)) if self.segment is not None else []
+        if self._journaled or self._flags:
+            status_columns = ['email'] + status_columns
+        columns = list(dict.fromkeys(status_columns + segment_columns))
+        if not columns:
+            # Sem colunas de status todas as linhas estão pendentes: basta contar as linhas
+            return sum(
+                int((chunk.index >= self.checkpoint.row).sum())
+                for chunk in self._iter_chunks(usecols=['email'], start=self._start)
+            )
+        
+        total = 0
+        for chunk in self._iter_chunks(usecols=columns, start=self._start):
+            for column in ('enviado', 'falhou'):
+                if column not in chunk.columns:
+                    chunk[column] = ''
+            if self._flags:
+                chunk = self._apply_flags(chunk)
+            if self._journaled:
+                chunk = self._apply_statuses(chunk, self._journaled)
+            total += int((self._selected_mask(chunk) & (chunk.index >= self.checkpoint.row)).sum())
+        return total
+
     @property
     def total_records(self) -> int:
         try:
             # Count records that haven't been sent, aren't marked as failed, and aren't unsubscribed
-            filter_conditions = (self.df['enviado'] == '') & (self.df['falhou'] != 'ok')
-            
-            # Adiciona filtro de descadastro se a coluna existir
-            if 'descadastro' in self.df.columns:
-                filter_conditions = filter_conditions & (self.df['descadastro'] != 'S')
-                
-            df_to_send = self.df[filter_conditions]
-            return len(df_to_send)
+            if self.streaming:
+                if self._total_records_cache is None:
+                    self._total_records_cache = self._count_pending()
+                return self._total_records_cache
+            return int(self._selected_mask(self.df).sum())
         except Exception as e:
             log.error(f"Error counting records: {str(e)}")
             raise
 
-    def mark_as_sent(self, email: str) -> None:
-        """Mark an email as sent."""
-        try:
-            idx = self.df[self.df['email'] == email.lower()].index
-            if len(idx) > 0:
-                self.df.loc[idx, 'enviado'] = 'ok'
-                # Save using atomic save
-                temp_path = f"{self.file_path}.temp.csv"
-                if not self._atomic_save(temp_path, self.file_path):
-                    return  # Return silently if save failed
-                log.debug(f"Marked {email} as sent")
+    def _build_email_index(self) -> None:
+        """
+        Builds the normalized email -> row position index used by status updates.
+
+        Repeated emails are kept in a separate map with all their positions, and a
+        status update applies to every occurrence (as the old full-column scan did).
+        """
+        positions: Dict[str, int] = {}
+        duplicates: Dict[str, List[int]] = {}
+        normalized = self.df['email'].astype(str).str.strip().str.lower()
+        for position, email in enumerate(normalized.tolist()):
+            first = positions.setdefault(email, position)
+            if first != position:
+                duplicates.setdefault(email, [first]).append(position)
+        self._email_positions = positions
+        self._duplicate_positions = duplicates
+        if duplicates:
+            log.info(f"{len(duplicates)} emails appear more than once in {self.file_path}; status updates apply to every occurrence")
+
+    def _rows_for(self, email: str) -> List[int]:
+        """Row positions of ``email`` (O(1) lookup in the email index)."""
+        email = email.strip().lower()
+        duplicates = self._duplicate_positions.get(email)
+        if duplicates is not None:
+            return duplicates
+        position = self._email_positions.get(email)
+        return [] if position is None else [position]
+
+    def _mark(self, email: str, column: str, attempt: int) -> None:
+        """Records a status change in the journal and in the loaded frame."""
+        self.journal.append(email, column, attempt)
+        if self.df is not None:
+            rows = self._rows_for(email)
+            if rows:
+                column_position = self.df.columns.get_loc(column)
+                for row in rows:
+                    self.df.iat[row, column_position] = 'ok'
             else:
                 log.warning(f"Email {email} not found in CSV file")
+
+    def mark_as_sent(self, email: str, attempt: int = 1) -> None:
+        """Mark an email as sent."""
+        try:
+            self._mark(email, STATUS_SENT, attempt)
+            log.debug(f"Marked {email} as sent")
         except Exception as e:
             log.error(f"Error marking email {email} as sent: {str(e)}")
 
-    def mark_as_failed(self, email: str) -> None:
+    def mark_as_failed(self, email: str, attempt: int = 1) -> None:
         """Mark an email as failed."""
         try:
-            idx = self.df[self.df['email'] == email.lower()].index
-            if len(idx) > 0:
-                self.df.loc[idx, 'falhou'] = 'ok'
-                # Save using atomic save
-                temp_path = f"{self.file_path}.temp.csv"
-                if not self._atomic_save(temp_path, self.file_path):
-                    return  # Return silently if save failed
-                log.debug(f"Marked {email} as failed")
-            else:
-                log.warning(f"Email {email} not found in CSV file")
+            self._mark(email, STATUS_FAILED, attempt)
+            log.debug(f"Marked {email} as failed")
         except Exception as e:
             log.error(f"Error marking email {email} as failed: {str(e)}")
 
+    def mark_invalid(self, batch: pd.DataFrame, reasons: pd.Series) -> None:
+        """
+        Marks the rows of ``batch`` rejected by the pre-send validation as failed, with
+        their reason code (``reasons``, aligned with ``batch``; '' for valid rows) in the
+        'invalido' column. The journal gets the whole batch at once and the loaded frame
+        is updated with one vectorized assignment.
+        """
+        invalid = reasons[reasons != '']
+        if invalid.empty:
+            return
+        emails = batch.loc[invalid.index, 'email'].astype(str)
+        self.journal.append_invalid(emails.tolist(), invalid.tolist())
+        if self.df is not None:
+            # Os lotes são fatias de self.df: o índice do lote localiza as linhas
+            positions = self.df.index.get_indexer(invalid.index)
+            found = positions >= 0
+            if STATUS_INVALID not in self.df.columns:
+                self.df[STATUS_INVALID] = ''
+            self.df.iloc[positions[found], self.df.columns.get_loc(STATUS_FAILED)] = 'ok'
+            self.df.iloc[positions[found], self.df.columns.get_loc(STATUS_INVALID)] = invalid.to_numpy()[found]
+        log.debug(f"Marked {len(invalid)} invalid addresses as failed")
+
+    def _rewrite_streaming(self, statuses: Dict[str, Dict[str, str]], matched: Optional[set] = None) -> bool:
+        """Rewrites the CSV chunk by chunk with the journaled statuses applied."""
+        temp_path = f"{self.file_path}.temp.csv"
+        try:
+            # Os offsets de início de cada bloco reescrito viram o índice do checkpoint
+            index = []
+            with open(temp_path, 'w', newline='', encoding='utf-8') as out:
+                first = True
+                for chunk in self._iter_chunks():
+                    chunk = self._apply_statuses(self._prepare_frame(chunk), statuses, matched=matched)
+                    if first:
+                        chunk.iloc[:0].to_csv(out, index=False, sep=self.separator)
+                        header = list(chunk.columns)
+                        first = False
+                    index.append((int(chunk.index[0]), out.tell()))
+                    chunk.to_csv(out, index=False, sep=self.separator, header=False)
+            os.replace(temp_path, self.file_path)
+            if not first:
+                # A reescrita pode ter acrescentado as colunas de status ao cabeçalho
+                self._header = header
+            self.last_save = time.time()
+            if self.checkpoint.row > 0:
+                self.checkpoint.set_index(self.file_path, index)
+                self.checkpoint.save()
+            return True
+        except Exception as e:
+            log.error(f"Error during streaming save: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+    def mark_batch_processed(self, batch: pd.DataFrame) -> None:
+        """
+        Records that every row up to the end of ``batch`` was handled (streaming mode).
+
+        The journal is flushed first, so the checkpoint never gets ahead of the
+        statuses that are on disk.
+        """
+        if not self.streaming or self.read_only or batch.empty:
+            return
+        self.journal.flush()
+        self.checkpoint.row = int(batch.index[-1]) + 1
+        self.checkpoint.email = str(batch['email'].iloc[-1]).strip().lower()
+        self.checkpoint.save()
+
+    def flush_stats(self) -> Dict[str, float]:
+        """Cadence and duration of the status flushes done so far."""
+        return self.journal.policy.stats()
+
+    def merge_journal(self) -> bool:
+        """
+        Merges the send journal into the CSV file with a single rewrite and removes it.
+
+        The journal is only removed when every journaled address matched a row of the
+        file; otherwise it is kept (and replayed on the next open) so no status is lost.
+
+        Returns:
+            True if the CSV is up to date, False if the save failed (the journal is kept).
+        """
+        self.journal.close()
+        if self.read_only:
+            # O journal é o arquivo de status lateral das entradas somente leitura
+            return True
+        statuses = self.journal.read()
+        if not statuses:
+            self.journal.discard()
+            return True
+        
+        matched: set = set()
+        if self.streaming:
+            saved = self._rewrite_streaming(statuses, matched)
+        else:
+            self._apply_statuses(self.df, statuses, matched=matched)
+            saved = self._atomic_save(f"{self.file_path}.temp.csv", self.file_path)
+
+        unmatched = len(statuses.keys() - matched)
+        if saved and unmatched:
+            log.warning(f"{unmatched} journaled recipients not found in {self.file_path}; "
+                        f"keeping the send journal {self.journal.path}")
+        elif saved:
+            self.journal.discard()
+            self._journaled = {}
+            log.info(f"Send journal merged into {self.file_path} ({len(statuses)} recipients)")
+        return saved
+
     def clear_sent_flags(self, clear_all: bool = True) -> None:
         """
         Clear flags in the CSV file.
@@ -250,9 +818,22 @@ class CSVReader:
             clear_all: If True, clears both 'enviado' and 'falhou' flags.
                       If False, only clears 'enviado' flag preserving 'falhou' status.
         """
+        if self.read_only:
+            self.journal.discard()
+            if 'enviado' in self._header or 'falhou' in self._header:
+                log.warning(f"Status columns stored in {self.file_path} itself were not changed")
+            log.info("Cleared flags from the send journal")
+            return
+        if self.streaming:
+            log.error("clear_sent_flags is not available in streaming mode")
+            return
         try:
+            # O journal pendente marcaria os emails de novo na próxima abertura
+            self.journal.discard()
+            self.checkpoint.discard()
+            
             # Save backup before modifying
-            shutil.copy2(self.file_path, self.backup_path)
+            self.backup_path = self.backup_manager.backup(self.file_path)
             
             # Store current values if we need to preserve failed status
             current_falhou = None
@@ -262,15 +843,22 @@ class CSVReader:
             # Clear flags
             self.df['enviado'] = ''
             self.df['falhou'] = '' if clear_all else self.df['falhou']
+            if clear_all and STATUS_INVALID in self.df.columns:
+                # Sem a falha, o endereço volta a ser validado no próximo envio
+                self.df[STATUS_INVALID] = ''
             
             # Restore falhou status if needed
             if not clear_all and current_falhou is not None:
                 self.df.loc[current_falhou == 'ok', 'falhou'] = 'ok'
             
-            self.df = self.df.fillna('')
+            # Só as colunas de status: fillna('') nas colunas category (ver _compact) falha,
+            # e to_csv já grava valores ausentes como vazio
+            for column in (STATUS_SENT, STATUS_FAILED):
+                self.df[column] = self.df[column].astype(object).fillna('')
             
             # Convert all emails to lowercase
             self.df['email'] = self.df['email'].str.lower()
+            self._build_email_index()
             
             # Save changes using atomic save
             temp_path = f"{self.file_path}.temp.csv"
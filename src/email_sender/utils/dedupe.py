@@ -0,0 +1,110 @@
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .csv_reader import COMPRESSION_SUFFIXES, DEFAULT_CHUNK_SIZE
+
+log = logging.getLogger("email_sender")
+
+# Arquivos de partição em disco; cada um precisa caber na memória na segunda passada
+DEFAULT_PARTITIONS = 16
+
+
+class DedupeStats(NamedTuple):
+    """Counts and timing of a streaming dedupe."""
+    total: int
+    kept: int
+    removed: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.seconds if self.seconds > 0 else 0.0
+
+
+def streaming_dedupe(input_path: str, output_path: str, column: str = "email", keep: str = "first", sep: str = ",",
+                     compression: Optional[str] = None, output_compression: Optional[str] = "infer",
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, partitions: int = DEFAULT_PARTITIONS,
+                     temp_dir: Optional[str] = None,
+                     key_func: Optional[Callable[[pd.Series], pd.Series]] = None) -> DedupeStats:
+    """
+    Removes rows that repeat ``column`` without loading the file into memory.
+
+    1. The key column is streamed and spilled to ``partitions`` files on disk,
+       partitioned by the key's hash, together with each row number.
+    2. Each partition (all occurrences of its keys) is loaded on its own and the
+       repeated row numbers are marked in a bitmap of one byte per row.
+    3. The file is streamed once more and the unmarked rows are written, in
+       their original order, to a temporary file that then replaces ``output_path``.
+
+    Memory use is bounded by one chunk plus the largest partition. Values are
+    copied as text, so the kept rows are written exactly as they were read.
+
+    Args:
+        keep: 'first' or 'last' occurrence to keep.
+        compression: Compression of the input (see csv_reader.compression_of).
+        output_compression: Compression of the output ('infer' uses its extension).
+        temp_dir: Where the partition files go; defaults to the system temp directory.
+        key_func: Maps the column to the compared key (e.g. AddressNormalizer.normalize);
+                  the values themselves are compared when None.
+    """
+    start = time.perf_counter()
+    header = list(pd.read_csv(input_path, sep=sep, nrows=0, compression=compression).columns)
+    if column not in header:
+        raise ValueError(f"Coluna '{column}' não encontrada no arquivo CSV")
+    read_options = dict(sep=sep, dtype=str, keep_default_na=False, chunksize=chunk_size, compression=compression)
+
+    with tempfile.TemporaryDirectory(prefix="dedupe_", dir=temp_dir) as workdir:
+        paths = [os.path.join(workdir, f"part_{p}.csv") for p in range(partitions)]
+        handles = [open(path, "w", newline="", encoding="utf-8") for path in paths]
+        total = 0
+        try:
+            with pd.read_csv(input_path, usecols=[column], **read_options) as reader:
+                for chunk in reader:
+                    keys = chunk[column] if key_func is None else key_func(chunk[column])
+                    part = pd.util.hash_pandas_object(keys, index=False).to_numpy() % partitions
+                    spill = pd.DataFrame({"row": chunk.index, "key": keys.to_numpy()})
+                    for p, group in spill.groupby(part, sort=False):
+                        group.to_csv(handles[p], header=False, index=False)
+                    total += len(chunk)
+        finally:
+            for handle in handles:
+                handle.close()
+
+        drop = np.zeros(total, dtype=bool)
+        for path in paths:
+            if os.path.getsize(path) == 0:
+                continue
+            part = pd.read_csv(path, names=["row", "key"], dtype={"row": "int64", "key": str}, keep_default_na=False)
+            drop[part["row"].to_numpy()[part["key"].duplicated(keep=keep).to_numpy()]] = True
+
+    removed = int(drop.sum())
+    if output_compression == "infer":
+        # O arquivo temporário não tem a extensão do destino
+        output_compression = COMPRESSION_SUFFIXES.get(Path(output_path).suffix.lower())
+    temp_path = f"{output_path}.dedupe.tmp"
+    try:
+        first = True
+        with pd.read_csv(input_path, **read_options) as reader:
+            for chunk in reader:
+                chunk[~drop[chunk.index]].to_csv(temp_path, index=False, sep=sep, mode="w" if first else "a",
+                                                 header=first, compression=output_compression)
+                first = False
+        if first:
+            pd.DataFrame(columns=header).to_csv(temp_path, index=False, sep=sep, compression=output_compression)
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    stats = DedupeStats(total, total - removed, removed, time.perf_counter() - start)
+    log.info(f"Streaming dedupe of {input_path}: {removed} of {total} rows removed "
+             f"({stats.rows_per_second:,.0f} rows/s)")
+    return stats
@@ -0,0 +1,135 @@
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger("email_sender")
+
+# Códigos de motivo gravados na coluna 'invalido' dos endereços recusados antes do envio
+REASON_NO_DOMAIN = "no_domain"
+REASON_LENGTH = "length"
+REASON_SYNTAX = "syntax"
+REASON_DISPOSABLE = "disposable"
+REASON_BLOCKED = "blocked"
+
+# Provedores de email temporário mais comuns; a lista é ampliada por disposable_domains_file
+DEFAULT_DISPOSABLE_DOMAINS = frozenset({
+    "10minutemail.com", "20minutemail.com", "discard.email", "dispostable.com", "emailondeck.com",
+    "fakeinbox.com", "getnada.com", "guerrillamail.com", "guerrillamail.net", "guerrillamailblock.com",
+    "mailcatch.com", "maildrop.cc", "mailinator.com", "mailnesia.com", "mintemail.com", "mohmal.com",
+    "mytemp.email", "sharklasers.com", "spamgourmet.com", "temp-mail.org", "tempail.com",
+    "tempmail.com", "tempmailo.com", "throwawaymail.com", "trashmail.com", "yopmail.com",
+})
+
+# Sintaxe prática (dot-atom do RFC 5322, sem comentários nem partes entre aspas).
+# Só classes de caracteres e repetições: a mesma expressão roda no re do Python e no
+# RE2 do pyarrow (strings do pandas 3); os caracteres não ASCII aceitam domínios IDN.
+_LOCAL_CHARS = "A-Za-z0-9!#$%&'*+/=?^_`{|}~-"
+_LABEL_CHARS = "A-Za-z0-9\u00a1-\uffff"
+_LABEL = f"[{_LABEL_CHARS}](?:[{_LABEL_CHARS}-]{{0,61}}[{_LABEL_CHARS}])?"
+EMAIL_PATTERN = (
+    f"[{_LOCAL_CHARS}]+(?:\\.[{_LOCAL_CHARS}]+)*"
+    f"@(?:{_LABEL}\\.)+(?:[A-Za-z\u00a1-\uffff]{{2,63}}|xn--[A-Za-z0-9-]{{1,59}})"
+)
+
+# Limites do RFC 5321 para o endereço e a parte local
+MAX_ADDRESS_LENGTH = 254
+MAX_LOCAL_LENGTH = 64
+
+
+def load_domain_list(file_path: str) -> set:
+    """Domains in a text file, one per line ('#' starts a comment; blank lines are ignored)."""
+    domains = set()
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            domain = line.split("#", 1)[0].strip().lower().lstrip("@").rstrip(".")
+            if domain:
+                domains.add(domain)
+    return domains
+
+
+class EmailValidator:
+    """
+    Pre-send check of recipient addresses, vectorized over pandas Series.
+
+    The syntax is checked with one compiled regular expression over the whole column
+    (``str.fullmatch``) plus the RFC 5321 length limits. Domains are then looked up in
+    the blocked and disposable sets once per distinct domain, walking up its parent
+    domains, so ``mx.mailinator.com`` matches ``mailinator.com``. Each address gets a
+    reason code ('' when it is valid), checked in this order: ``no_domain`` (no '@' or
+    nothing after it), ``length``, ``syntax``, ``blocked`` and ``disposable``.
+    """
+
+    def __init__(self, blocked_domains: Optional[Iterable[str]] = None,
+                 disposable_domains: Optional[Iterable[str]] = None,
+                 disposable_domains_file: Optional[str] = None):
+        """
+        Args:
+            blocked_domains: Domains never sent to (reason ``blocked``).
+            disposable_domains: Temporary email domains; None uses DEFAULT_DISPOSABLE_DOMAINS.
+            disposable_domains_file: Text file with more disposable domains, one per line.
+        """
+        self.blocked_domains = {self._clean(d) for d in blocked_domains or ()} - {""}
+        self.disposable_domains = {self._clean(d) for d in (
+            DEFAULT_DISPOSABLE_DOMAINS if disposable_domains is None else disposable_domains
+        )} - {""}
+        if disposable_domains_file:
+            if Path(disposable_domains_file).exists():
+                self.disposable_domains |= load_domain_list(disposable_domains_file)
+            else:
+                log.warning(f"Disposable domains file not found: {disposable_domains_file}")
+        self._domain_cache: Dict[str, str] = {}
+
+    @staticmethod
+    def _clean(domain: str) -> str:
+        return str(domain).strip().lower().lstrip("@").rstrip(".")
+
+    def domain_reason(self, domain: str) -> str:
+        """Reason code of a (lowercased) domain: 'blocked', 'disposable' or ''."""
+        reason = self._domain_cache.get(domain)
+        if reason is None:
+            reason = ""
+            labels = domain.split(".")
+            # O próprio domínio e cada domínio pai, sem chegar ao TLD sozinho
+            for start in range(max(len(labels) - 1, 1)):
+                suffix = ".".join(labels[start:])
+                if suffix in self.blocked_domains:
+                    reason = REASON_BLOCKED
+                    break
+                if suffix in self.disposable_domains:
+                    reason = REASON_DISPOSABLE
+            self._domain_cache[domain] = reason
+        return reason
+
+    def reasons(self, emails: pd.Series) -> pd.Series:
+        """
+        Reason code of each address (aligned with ``emails``); '' for valid addresses.
+        Empty addresses are left as '' (the send loop reports them on its own).
+        """
+        emails = emails.fillna("").astype(str).str.strip()
+        present = (emails != "").to_numpy()
+        # Substituição por regex em vez de rpartition: roda no motor de strings, sem objetos por linha
+        domains = emails.str.replace("^.*@", "", regex=True)
+        lengths = emails.str.len()
+        has_domain = (emails.str.contains("@", regex=False) & (domains != "")).to_numpy(dtype=bool)
+        valid_length = (
+            (lengths <= MAX_ADDRESS_LENGTH) & (lengths - domains.str.len() - 1 <= MAX_LOCAL_LENGTH)
+        ).to_numpy(dtype=bool)
+        matches = emails.str.fullmatch(EMAIL_PATTERN).fillna(False).to_numpy(dtype=bool)
+        valid_syntax = has_domain & valid_length & matches
+        reasons = np.select(
+            [~present, ~has_domain, ~valid_length, ~matches],
+            ["", REASON_NO_DOMAIN, REASON_LENGTH, REASON_SYNTAX],
+            default="",
+        ).astype(object)
+
+        checked = present & valid_syntax
+        if checked.any() and (self.blocked_domains or self.disposable_domains):
+            domains = domains[checked].str.lower()
+            # Um lookup por domínio distinto, expandido para as linhas pelos códigos
+            codes, uniques = pd.factorize(domains)
+            per_domain = np.array([self.domain_reason(domain) for domain in uniques], dtype=object)
+            reasons[checked] = per_domain[codes]
+        return pd.Series(reasons, index=emails.index, dtype=object)
@@ -0,0 +1,107 @@
+import logging
+from typing import Callable, Iterable, List, Optional
+
+import pandas as pd
+
+from .csv_reader import DEFAULT_CHUNK_SIZE, STATUS_COLUMNS, compression_of, detect_separator
+from .send_journal import STATUS_INVALID
+
+log = logging.getLogger("email_sender")
+
+# Colunas de status pertencem à lista de destinatários e nunca vêm do arquivo de junção
+NEVER_JOINED = frozenset(STATUS_COLUMNS) | {STATUS_INVALID}
+
+
+def _strip(values: pd.Series) -> pd.Series:
+    return values.fillna("").astype(str).str.strip()
+
+
+def read_join_header(file_path: str) -> List[str]:
+    """Column names of a join file (plain or compressed CSV)."""
+    return list(pd.read_csv(file_path, sep=detect_separator(file_path), nrows=0,
+                            compression=compression_of(file_path)).columns)
+
+
+class JoinTable:
+    """
+    Hash index over a secondary data file (e.g. a CRM export), used to enrich
+    recipient batches with its columns while the recipient list is streamed.
+
+    Only the join key and the requested columns are read, chunk by chunk, into a
+    DataFrame indexed by the key. Status columns (see NEVER_JOINED) are never read. When ``keys`` is given (the keys of a recipient
+    list smaller than the file), rows with other keys are dropped while reading,
+    so the index holds at most as many rows as the smaller side of the join.
+    Repeated keys keep their first row.
+    """
+
+    def __init__(self, file_path: str, on: str = "email", columns: Optional[Iterable[str]] = None,
+                 key_func: Optional[Callable[[pd.Series], pd.Series]] = None, keys: Optional[set] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            file_path: CSV file (plain or compressed) with the extra columns.
+            on: Column present in both files.
+            columns: Columns brought from the file; None brings every other non-status column.
+            key_func: Maps a key column to the compared key (e.g. AddressNormalizer.normalize);
+                      values are only stripped when None.
+            keys: If given, only rows whose key is in this set are kept.
+            chunk_size: Rows read per chunk.
+        """
+        self.file_path = file_path
+        self.on = on
+        self.key_func = key_func or _strip
+        separator = detect_separator(file_path)
+        compression = compression_of(file_path)
+        header = read_join_header(file_path)
+        if on not in header:
+            raise ValueError(f"Coluna '{on}' não encontrada no arquivo {file_path}")
+        if columns is None:
+            self.columns: List[str] = [c for c in header if c != on and c not in NEVER_JOINED]
+        else:
+            missing = sorted(set(columns) - set(header))
+            if missing:
+                raise ValueError(f"Colunas não encontradas no arquivo {file_path}: {', '.join(missing)}")
+            self.columns = [c for c in dict.fromkeys(columns) if c != on and c not in NEVER_JOINED]
+
+        parts = []
+        total = 0
+        with pd.read_csv(file_path, sep=separator, dtype=str, keep_default_na=False, compression=compression,
+                         usecols=[on] + self.columns, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                total += len(chunk)
+                chunk.index = self.key_func(chunk[on]).to_numpy()
+                chunk = chunk[chunk.index != ""]
+                if keys is not None:
+                    chunk = chunk[chunk.index.isin(keys)]
+                parts.append(chunk[self.columns])
+        table = pd.concat(parts) if parts else pd.DataFrame(columns=self.columns)
+        repeated = table.index.duplicated(keep="first")
+        if repeated.any():
+            log.warning(f"{int(repeated.sum())} repeated '{on}' values in {file_path}; keeping the first row of each")
+            table = table[~repeated]
+        self.table = table
+        log.info(f"Join index on '{on}' built from {file_path}: {len(table)} of {total} rows, "
+                 f"columns {', '.join(self.columns) or '-'}")
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def enrich(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns ``batch`` with the joined columns (hash lookup of each row's key).
+
+        Rows without a match get ''. A column that already exists in the batch keeps
+        its values and is only filled where it is empty.
+        """
+        if self.on not in batch.columns:
+            raise ValueError(f"Coluna '{self.on}' não encontrada na lista de destinatários")
+        matched = self.table.reindex(self.key_func(batch[self.on]).to_numpy())
+        batch = batch.copy()
+        for column in self.columns:
+            values = matched[column].fillna("").to_numpy()
+            if column in batch.columns:
+                current = batch[column].astype(object).where(batch[column].notna(), "").astype(str)
+                batch[column] = current.where(current != "", values)
+            else:
+                batch[column] = values
+        return batch
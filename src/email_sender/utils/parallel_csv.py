@@ -0,0 +1,144 @@
+import csv
+import io
+import logging
+import mmap
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+
+log = logging.getLogger("email_sender")
+
+# Abaixo deste tamanho o custo de subir o pool supera o ganho
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# Partes por worker: partes menores equilibram melhor a carga entre os processos
+PARTS_PER_WORKER = 2
+
+
+def _next_record(mm: mmap.mmap, position: int, quoted: bool) -> Tuple[int, bool]:
+    """
+    Offset right after the first line break at or after ``position`` that ends a record.
+
+    ``quoted`` tells whether ``position`` is inside a quoted field; line breaks inside
+    quotes are skipped. Escaped quotes ("") do not change the parity, so counting
+    quote characters is enough.
+    """
+    size = len(mm)
+    while True:
+        newline = mm.find(b"\n", position)
+        if newline == -1:
+            return size, quoted
+        quoted ^= bool(mm[position:newline].count(b'"') & 1)
+        position = newline + 1
+        if not quoted:
+            return position, quoted
+
+
+def split_offsets(file_path: str, parts: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Splits a CSV file into about ``parts`` byte ranges that start and end on record boundaries.
+
+    Returns:
+        The raw header line and the ``(start, end)`` ranges of the data rows.
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b"", []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            header_end, _ = _next_record(mm, 0, False)
+            header = mm[:header_end]
+
+            bounds = [header_end]
+            position, quoted = header_end, False
+            for i in range(1, parts):
+                target = header_end + (size - header_end) * i // parts
+                if target > position:
+                    quoted ^= bool(mm[position:target].count(b'"') & 1)
+                    position = target
+                position, quoted = _next_record(mm, position, quoted)
+                if position >= size:
+                    break
+                if position > bounds[-1]:
+                    bounds.append(position)
+            bounds.append(size)
+    return header, [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _init_worker() -> None:
+    # Ctrl+C é tratado pelo processo principal; os workers só morrem junto com o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _parse_range(file_path: str, byte_range: Tuple[int, int], sep: str, names: List[str], kwargs: dict) -> pd.DataFrame:
+    """Parses one byte range of the file inside a worker process."""
+    start, end = byte_range
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), sep=sep, header=None, names=names, **kwargs)
+
+
+def read_csv_parallel(file_path: str, sep: str = ",", compression: Optional[str] = None, workers: int = 0,
+                      min_bytes: int = PARALLEL_MIN_BYTES, **kwargs: Any) -> pd.DataFrame:
+    """
+    Reads a CSV file with the pandas C parser, splitting it across a process pool.
+
+    The file is cut at record boundaries (line breaks inside quoted fields are
+    respected), each range is parsed in a worker and the frames are concatenated
+    in file order. Compressed files, files smaller than ``min_bytes`` and
+    ``workers == 1`` fall back to a single ``pd.read_csv``.
+
+    Without an explicit ``dtype`` for every column, the first range is parsed first
+    and its inferred dtypes are pinned for the other ranges, so a column cannot come
+    back as int64 from one range and as text from another (e.g. zip codes losing
+    their leading zeros in some rows only). If a later range does not fit those
+    dtypes, the whole file is read again with a single ``pd.read_csv``. Callers that
+    write the frame back to the file should pass ``dtype=str, keep_default_na=False``.
+
+    Args:
+        file_path: CSV file to read.
+        sep: Field separator.
+        compression: Compression of the file (see csv_reader.compression_of), if any.
+        workers: Worker processes; 0 uses every core.
+        min_bytes: Smallest file size parsed in parallel.
+        **kwargs: Passed to ``pd.read_csv`` (dtype, keep_default_na, usecols, ...).
+    """
+    workers = workers or os.cpu_count() or 1
+    if compression or workers <= 1 or os.path.getsize(file_path) < min_bytes:
+        return pd.read_csv(file_path, sep=sep, compression=compression, **kwargs)
+
+    header, ranges = split_offsets(file_path, workers * PARTS_PER_WORKER)
+    if len(ranges) <= 1:
+        return pd.read_csv(file_path, sep=sep, **kwargs)
+    names = next(csv.reader([header.decode("utf-8-sig").rstrip("\r\n")], delimiter=sep))
+
+    first = _parse_range(file_path, ranges[0], sep, names, kwargs)
+    rest_kwargs = _pinned_dtypes(first, kwargs)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges) - 1), initializer=_init_worker) as executor:
+            frames = [first] + list(executor.map(_parse_range, repeat(file_path), ranges[1:], repeat(sep),
+                                                 repeat(names), repeat(rest_kwargs)))
+    except (ValueError, TypeError, OverflowError) as e:
+        log.warning(f"Column types of {file_path} differ between parts ({e}); reading it in a single pass")
+        return pd.read_csv(file_path, sep=sep, **kwargs)
+    log.debug(f"Parsed {file_path} in {len(ranges)} parts with {min(workers, len(ranges) - 1) + 1} workers")
+    return pd.concat(frames, ignore_index=True)
+
+
+def _pinned_dtypes(first: pd.DataFrame, kwargs: dict) -> dict:
+    """``kwargs`` with the dtypes inferred for the first range added for every column without one."""
+    dtype = kwargs.get("dtype")
+    if dtype is not None and not isinstance(dtype, dict):
+        # Um único dtype (ex.: str) já vale para todas as colunas
+        return kwargs
+    pinned = {
+        name: first[name].dtype for name in first.columns
+        # Datas só são lidas por parse_dates, não por dtype
+        if not pd.api.types.is_datetime64_any_dtype(first[name].dtype)
+    }
+    return {**kwargs, "dtype": {**pinned, **(dtype or {})}}
@@ -0,0 +1,95 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+# Colunas de texto com no máximo esta fração de valores distintos viram category
+CATEGORY_MAX_RATIO = 0.5
+
+# Abaixo disso a conversão para category não compensa
+CATEGORY_MIN_ROWS = 1000
+
+
+def categorize_low_cardinality(df: pd.DataFrame, exclude: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Converts low-cardinality text columns (cidade, empresa, ...) to the category dtype.
+
+    Each distinct value is then stored once and rows keep a small integer code.
+    Columns in ``exclude`` (email and the status columns, which are updated in place)
+    are left untouched.
+    """
+    if len(df) < CATEGORY_MIN_ROWS:
+        return df
+    excluded = set(exclude)
+    for column in df.columns:
+        if column in excluded or not (pd.api.types.is_object_dtype(df[column]) or pd.api.types.is_string_dtype(df[column])):
+            continue
+        if df[column].nunique(dropna=False) <= len(df) * CATEGORY_MAX_RATIO:
+            df[column] = df[column].astype('category')
+    return df
+
+
+class RecipientRecord(Mapping):
+    """
+    Read-only, dict-like view of one recipient in a RecipientBatch.
+
+    Holds only a reference to the batch and a row number; values are looked up in
+    the batch's column arrays when accessed.
+    """
+
+    __slots__ = ('_batch', '_row')
+
+    def __init__(self, batch: "RecipientBatch", row: int):
+        self._batch = batch
+        self._row = row
+
+    def __getitem__(self, name: str) -> Any:
+        return self._batch.column(name)[self._row]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._batch.fields)
+
+    def __len__(self) -> int:
+        return len(self._batch.fields)
+
+    def __repr__(self) -> str:
+        return f"RecipientRecord({dict(self)!r})"
+
+
+class RecipientBatch:
+    """
+    Compact batch of recipients backed by column arrays.
+
+    Only ``fields`` are kept (all columns when None), each as one array, instead of a
+    dict per recipient holding every CSV column. Iterating yields RecipientRecord views.
+    """
+
+    __slots__ = ('fields', '_columns', '_length')
+
+    def __init__(self, frame: pd.DataFrame, fields: Optional[Iterable[str]] = None):
+        if fields is None:
+            self.fields = list(frame.columns)
+        else:
+            self.fields = [name for name in dict.fromkeys(fields) if name in frame.columns]
+        self._columns: Dict[str, Any] = {name: frame[name].to_numpy() for name in self.fields}
+        self._length = len(frame)
+
+    def column(self, name: str) -> Any:
+        """The array of values of field ``name`` (KeyError if it was not kept)."""
+        return self._columns[name]
+
+    def tolist(self, name: str) -> List[Any]:
+        return self._columns[name].tolist()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, row: int) -> RecipientRecord:
+        if row < 0:
+            row += self._length
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        return RecipientRecord(self, row)
+
+    def __iter__(self) -> Iterator[RecipientRecord]:
+        return (RecipientRecord(self, row) for row in range(self._length))
@@ -0,0 +1,390 @@
+import logging
+import signal
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, List, Dict, Generator, Union, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from .csv_reader import compression_of, detect_separator, DEFAULT_CHUNK_SIZE
+from .recipient_batch import RecipientBatch
+from .segment import Segment, register_sql_functions
+from .send_journal import STATUS_SENT, STATUS_FAILED, STATUS_INVALID, FlushPolicy
+
+log = logging.getLogger("email_sender")
+
+# Extensões tratadas como banco SQLite em vez de CSV
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+TABLE = "recipients"
+
+# Colunas de status sempre presentes no banco (vazias quando ausentes no CSV importado)
+STATUS_COLUMNS = (STATUS_SENT, STATUS_FAILED, 'descadastro')
+
+# Mesmo critério de CSVReader._pending_mask, respondido pelo índice de status
+PENDING_WHERE = "enviado = '' AND falhou != 'ok' AND descadastro != 'S'"
+
+# Índice parcial só com as linhas pendentes: as entradas ficam em ordem de rowid, então a
+# paginação por rowid e a contagem de pendentes não passam pelas linhas já processadas
+PENDING_INDEX = f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_pending ON {TABLE}(enviado) WHERE {PENDING_WHERE}"
+
+
+def is_sqlite_store(path: Union[str, Path]) -> bool:
+    """True if ``path`` names a SQLite recipient store rather than a CSV file."""
+    return Path(path).suffix.lower() in SQLITE_SUFFIXES
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteRecipientStore:
+    """
+    Recipient list kept in a SQLite database (WAL mode) instead of a CSV file.
+
+    Exposes the same interface as CSVReader (get_batches, total_records, columns,
+    mark_as_sent/mark_as_failed, merge_journal), so EmailService can use either.
+    Pending-recipient filters run against the status index and status updates are
+    single-row UPDATEs on the email index, so counts and resumes do not rescan the list.
+    Status updates are buffered and applied in one transaction whenever ``flush_policy``
+    says so, at the end of the run and, for the store driving a send
+    (``install_signal_handlers``), on SIGINT/SIGTERM.
+
+    A ``where`` segment expression (see utils.segment.Segment) is compiled to a SQL
+    predicate added to the pending filter; the pending count is cached until the
+    next write.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_policy: Optional[FlushPolicy] = None,
+                 where: Optional[str] = None):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.policy = flush_policy or FlushPolicy()
+        self._pending: List[Tuple[str, str]] = []
+        self._total_records_cache: Optional[int] = None
+        self._previous_handlers: Dict[int, object] = {}
+
+        if not Path(db_path).exists():
+            raise FileNotFoundError(f"Recipient store not found: {db_path}")
+
+        self.conn = _connect(db_path)
+        self._columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({TABLE})")]
+        if 'email' not in self._columns:
+            self.conn.close()
+            raise ValueError(f"Recipient store {db_path} has no '{TABLE}' table with an 'email' column")
+
+        self.segment = Segment(where) if where else None
+        self._where, self._where_params = PENDING_WHERE, []
+        if self.segment is not None:
+            missing = sorted(self.segment.columns - set(self._columns))
+            if missing:
+                self.conn.close()
+                raise ValueError(f"Columns used by the segment not found in {db_path}: {', '.join(missing)}")
+            register_sql_functions(self.conn)
+            clause, self._where_params = self.segment.to_sql(_quote)
+            self._where = f"{PENDING_WHERE} AND {clause}"
+
+        # Bancos importados antes do índice parcial ganham o índice na primeira abertura
+        with self.conn:
+            self.conn.execute(PENDING_INDEX)
+
+    def install_signal_handlers(self) -> None:
+        """
+        Saves the buffered status updates on SIGINT/SIGTERM. Only the store that drives a
+        send installs them; the previous handlers come back with restore_signal_handlers/close.
+        """
+        if threading.current_thread() is not threading.main_thread() or self._previous_handlers:
+            return
+
+        def signal_handler(signum, frame):
+            log.warning(f"\nReceived {signal.Signals(signum).name}. Saving pending status updates...")
+            self.merge_journal()
+            sys.exit(1)
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self._previous_handlers[signum] = signal.signal(signum, signal_handler)
+
+    def restore_signal_handlers(self) -> None:
+        """Puts back the handlers replaced by install_signal_handlers."""
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler if handler is not None else signal.SIG_DFL)
+        self._previous_handlers = {}
+
+    @classmethod
+    def import_csv(cls, csv_path: str, db_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Creates (or replaces) a recipient store from a CSV file in the current format.
+
+        The CSV is read in chunks, so files larger than memory can be imported.
+
+        Returns:
+            Number of rows imported.
+        """
+        if not Path(csv_path).exists():
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+
+        separator = detect_separator(csv_path)
+        compression = compression_of(csv_path)
+        header = list(pd.read_csv(csv_path, sep=separator, nrows=0, compression=compression).columns)
+        if 'email' not in header:
+            raise ValueError("CSV file must contain an 'email' column")
+        columns = header + [c for c in STATUS_COLUMNS if c not in header]
+
+        conn = _connect(db_path)
+        try:
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+                conn.execute(
+                    f"CREATE TABLE {TABLE} ("
+                    + ", ".join(f"{_quote(c)} TEXT NOT NULL DEFAULT ''" for c in columns)
+                    + ")"
+                )
+                insert = (
+                    f"INSERT INTO {TABLE} ({', '.join(_quote(c) for c in columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})"
+                )
+                total = 0
+                for chunk in pd.read_csv(csv_path, sep=separator, dtype=str, keep_default_na=False, chunksize=chunk_size,
+                                         compression=compression):
+                    for column in columns:
+                        if column not in chunk.columns:
+                            chunk[column] = ''
+                    chunk['email'] = chunk['email'].str.strip().str.lower()
+                    conn.executemany(insert, chunk[columns].itertuples(index=False, name=None))
+                    total += len(chunk)
+
+                # Índices criados depois da carga, que assim fica bem mais rápida
+                conn.execute(f"CREATE INDEX idx_{TABLE}_email ON {TABLE}(email)")
+                conn.execute(f"CREATE INDEX idx_{TABLE}_status ON {TABLE}(enviado, falhou, descadastro)")
+                conn.execute(PENDING_INDEX)
+        finally:
+            conn.close()
+
+        log.info(f"Imported {total} recipients from {csv_path} into {db_path}")
+        return total
+
+    def export_csv(self, csv_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Writes the store back to a CSV file in the current format.
+
+        Returns:
+            Number of rows exported.
+        """
+        self.merge_journal()
+        query = f"SELECT {', '.join(_quote(c) for c in self._columns)} FROM {TABLE} ORDER BY rowid"
+        total = 0
+        first = True
+        for chunk in pd.read_sql_query(query, self.conn, chunksize=chunk_size):
+            chunk.to_csv(csv_path, index=False, mode='w' if first else 'a', header=first)
+            first = False
+            total += len(chunk)
+        if first:
+            pd.DataFrame(columns=self._columns).to_csv(csv_path, index=False)
+        log.info(f"Exported {total} recipients from {self.db_path} to {csv_path}")
+        return total
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names available for each recipient."""
+        return list(self._columns)
+
+    @property
+    def total_records(self) -> int:
+        """Number of pending recipients in the segment (index-only count without one), cached until the next write."""
+        if self._total_records_cache is None:
+            self._total_records_cache = self.conn.execute(
+                f"SELECT COUNT(*) FROM {TABLE} WHERE {self._where}", self._where_params
+            ).fetchone()[0]
+        return self._total_records_cache
+
+    def get_batches(self, as_frames: bool = False, fields: Optional[Iterable[str]] = None) -> Generator[Union[RecipientBatch, pd.DataFrame], None, None]:
+        """
+        Yields the pending recipients in batches of ``batch_size``.
+
+        Batches are paged by rowid, so recipients marked while iterating do not shift
+        the following pages. Each page is a range search on the partial index of pending
+        rows (enviado = '' AND rowid > ?), so a resume does not rescan the processed rows.
+        """
+        query = (
+            f"SELECT rowid, {', '.join(_quote(c) for c in self._columns)} FROM {TABLE} "
+            f"WHERE rowid > ? AND {self._where} ORDER BY rowid LIMIT ?"
+        )
+        last_rowid = 0
+        while True:
+            rows = self.conn.execute(query, (last_rowid, *self._where_params, self.batch_size)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            batch = pd.DataFrame.from_records([row[1:] for row in rows], columns=self._columns)
+            yield batch if as_frames else RecipientBatch(batch, fields)
+
+    def _mark(self, email: str, column: str) -> None:
+        self._pending.append((column, email.lower()))
+        if self.policy.add(len(email)):
+            self.merge_journal()
+
+    def mark_as_sent(self, email: str, attempt: int = 1) -> None:
+        """Mark an email as sent."""
+        try:
+            self._mark(email, STATUS_SENT)
+            log.debug(f"Marked {email} as sent")
+        except Exception as e:
+            log.error(f"Error marking email {email} as sent: {str(e)}")
+
+    def mark_as_failed(self, email: str, attempt: int = 1) -> None:
+        """Mark an email as failed."""
+        try:
+            self._mark(email, STATUS_FAILED)
+            log.debug(f"Marked {email} as failed")
+        except Exception as e:
+            log.error(f"Error marking email {email} as failed: {str(e)}")
+
+    def mark_invalid(self, batch: pd.DataFrame, reasons: pd.Series) -> None:
+        """
+        Marks the rows of ``batch`` rejected by the pre-send validation as failed, with
+        their reason code in the 'invalido' column (counterpart of CSVReader.mark_invalid),
+        in one transaction.
+        """
+        invalid = reasons[reasons != '']
+        if invalid.empty:
+            return
+        emails = batch.loc[invalid.index, 'email'].astype(str).str.strip().str.lower()
+        self._total_records_cache = None
+        with self.conn:
+            if STATUS_INVALID not in self._columns:
+                self.conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(STATUS_INVALID)} TEXT NOT NULL DEFAULT ''")
+                self._columns.append(STATUS_INVALID)
+            self.conn.executemany(
+                f"UPDATE {TABLE} SET {_quote(STATUS_FAILED)} = 'ok', {_quote(STATUS_INVALID)} = ? WHERE email = ?",
+                zip(invalid.tolist(), emails.tolist()),
+            )
+        log.debug(f"Marked {len(invalid)} invalid addresses as failed")
+
+    def mark_batch_processed(self, batch: pd.DataFrame) -> None:
+        """No-op: a resumed run already starts at the first pending row through the status index."""
+
+    def flush_stats(self) -> Dict[str, float]:
+        """Cadence and duration of the status flushes done so far."""
+        return self.policy.stats()
+
+    def merge_journal(self) -> bool:
+        """Applies the buffered status updates in one transaction (counterpart of CSVReader.merge_journal)."""
+        if not self._pending:
+            return True
+        try:
+            with self.policy.flushing(), self.conn:
+                for column in (STATUS_SENT, STATUS_FAILED):
+                    emails = [(email,) for marked, email in self._pending if marked == column]
+                    if emails:
+                        self.conn.executemany(f"UPDATE {TABLE} SET {_quote(column)} = 'ok' WHERE email = ?", emails)
+            self._pending.clear()
+            self._total_records_cache = None
+            return True
+        except sqlite3.Error as e:
+            log.error(f"Error committing status updates to {self.db_path}: {str(e)}")
+            return False
+
+    def clear_sent_flags(self, columns: Iterable[str] = (STATUS_SENT, STATUS_FAILED)) -> Dict[str, int]:
+        """
+        Clears the given flag columns.
+
+        Returns:
+            Number of flags cleared per column.
+        """
+        cleared = {}
+        self._total_records_cache = None
+        with self.conn:
+            for column in columns:
+                if column not in self._columns:
+                    log.warning(f"Column '{column}' not found in {self.db_path}")
+                    cleared[column] = 0
+                    continue
+                cursor = self.conn.execute(f"UPDATE {TABLE} SET {_quote(column)} = '' WHERE {_quote(column)} != ''")
+                cleared[column] = cursor.rowcount
+        return cleared
+
+    def set_flag(self, emails: Iterable[str], column: str, value: str = 'True') -> int:
+        """
+        Sets ``column`` to ``value`` for every row whose email is in ``emails``.
+
+        Used by the unsubscribe/bounce syncs; the column is created if needed.
+
+        Returns:
+            Number of rows updated.
+        """
+        self._total_records_cache = None
+        with self.conn:
+            if column not in self._columns:
+                self.conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(column)} TEXT NOT NULL DEFAULT ''")
+                self._columns.append(column)
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS flag_emails (email TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM flag_emails")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO flag_emails (email) VALUES (?)",
+                ((email.lower(),) for email in emails),
+            )
+            cursor = self.conn.execute(
+                f"UPDATE {TABLE} SET {_quote(column)} = ? "
+                f"WHERE {_quote(column)} != ? AND email IN (SELECT email FROM flag_emails)",
+                (value, value),
+            )
+        return cursor.rowcount
+
+    def remove_duplicates(self, column: str = 'email', keep: str = 'first',
+                          key_func: Optional[Callable[[pd.Series], pd.Series]] = None) -> int:
+        """
+        Deletes rows that repeat ``column``, keeping the first or last occurrence.
+
+        With ``key_func`` (e.g. AddressNormalizer.normalize) rows are compared by the
+        key computed from ``column``; only rowid and the column are read for that.
+
+        Returns:
+            Number of rows removed.
+        """
+        if column not in self._columns:
+            raise ValueError(f"Coluna '{column}' não encontrada no banco {self.db_path}")
+        self._total_records_cache = None
+        if key_func is not None:
+            rows = pd.read_sql_query(f"SELECT rowid, {_quote(column)} AS value FROM {TABLE} ORDER BY rowid", self.conn)
+            repeated = rows["rowid"][key_func(rows["value"]).duplicated(keep=keep).to_numpy()]
+            with self.conn:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS drop_rowids (id INTEGER PRIMARY KEY)")
+                self.conn.execute("DELETE FROM drop_rowids")
+                self.conn.executemany("INSERT INTO drop_rowids (id) VALUES (?)", ((int(r),) for r in repeated))
+                cursor = self.conn.execute(f"DELETE FROM {TABLE} WHERE rowid IN (SELECT id FROM drop_rowids)")
+            return cursor.rowcount
+        aggregate = "MIN" if keep == "first" else "MAX"
+        with self.conn:
+            cursor = self.conn.execute(
+                f"DELETE FROM {TABLE} WHERE rowid NOT IN "
+                f"(SELECT {aggregate}(rowid) FROM {TABLE} GROUP BY {_quote(column)})"
+            )
+        return cursor.rowcount
+
+    def values(self, column: str) -> pd.Series:
+        """``column`` of every row."""
+        if column not in self._columns:
+            raise ValueError(f"Coluna '{column}' não encontrada no banco {self.db_path}")
+        return pd.read_sql_query(f"SELECT {_quote(column)} AS value FROM {TABLE} ORDER BY rowid", self.conn)["value"].rename(column)
+
+    def emails(self) -> pd.Series:
+        """The email column of every row."""
+        return self.values("email")
+
+    def count(self) -> int:
+        """Total number of rows in the store."""
+        return self.conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+    def close(self) -> None:
+        self.restore_signal_handlers()
+        self.merge_journal()
+        self.conn.close()
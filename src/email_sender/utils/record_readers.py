@@ -0,0 +1,125 @@
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+# Formatos de registros lidos linha a linha (extensão -> formato)
+RECORD_SUFFIXES = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.xlsx': 'xlsx', '.xlsm': 'xlsx'}
+
+
+def record_format_of(file_path: str) -> Optional[str]:
+    """'jsonl' or 'xlsx' for JSON Lines and Excel recipient files, None otherwise."""
+    return RECORD_SUFFIXES.get(Path(file_path).suffix.lower())
+
+
+def _as_text(value: Any) -> str:
+    # Mesmo resultado do CSV lido com dtype=str e keep_default_na=False
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _frame(rows: List[Dict[str, Any]], first_row: int, columns: List[str]) -> pd.DataFrame:
+    df = pd.DataFrame.from_records([{k: _as_text(v) for k, v in row.items()} for row in rows], columns=columns)
+    df.index = pd.RangeIndex(first_row, first_row + len(df))
+    return df.fillna('')
+
+
+# --- JSON Lines ----------------------------------------------------------------------
+
+def _jsonl_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number} of {file_path}: {e.msg}")
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {line_number} of {file_path} is not a JSON object")
+            yield record
+
+
+# --- XLSX ----------------------------------------------------------------------------
+
+def _open_workbook(file_path: str):
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("Reading .xlsx recipient files requires openpyxl (pip install openpyxl)") from e
+    # read_only: as linhas são lidas do XML sob demanda, sem carregar a planilha inteira
+    return openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+
+
+def _xlsx_rows(file_path: str) -> Iterator[tuple]:
+    workbook = _open_workbook(file_path)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            # Planilhas costumam ter linhas vazias no fim da área usada
+            if any(value is not None and value != '' for value in row):
+                yield row
+    finally:
+        workbook.close()
+
+
+def _xlsx_header(row: tuple) -> List[str]:
+    header = [_as_text(value).strip() for value in row]
+    while header and not header[-1]:
+        header.pop()
+    return header
+
+
+def _xlsx_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    rows = _xlsx_rows(file_path)
+    header = _xlsx_header(next(rows, ()))
+    for row in rows:
+        yield {name: value for name, value in zip(header, row) if name}
+
+
+# --- Interface comum ------------------------------------------------------------------
+
+def read_record_header(file_path: str, record_format: str) -> List[str]:
+    """
+    Column names of a record file: the first row of the active sheet (XLSX) or the
+    union of the keys of every record, in order of first appearance (JSON Lines;
+    records do not need to share their keys, so the whole file is scanned).
+    """
+    if record_format == 'xlsx':
+        return [name for name in _xlsx_header(next(_xlsx_rows(file_path), ())) if name]
+    return list(dict.fromkeys(key for record in _jsonl_records(file_path) for key in record))
+
+
+def iter_record_chunks(file_path: str, record_format: str, chunk_size: int,
+                       usecols: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Reads a JSON Lines or XLSX file in DataFrames of ``chunk_size`` rows, one record
+    at a time, with every value as text ('' for missing), like the CSV reader.
+
+    The index holds the row numbers in the file (first data row = 0). Every chunk
+    has the same columns: ``usecols`` when given, otherwise the whole header
+    (read_record_header); keys missing from a record become ''.
+    """
+    columns = list(usecols) if usecols is not None else read_record_header(file_path, record_format)
+    records = _xlsx_records(file_path) if record_format == 'xlsx' else _jsonl_records(file_path)
+    first_row = 0
+    while True:
+        rows = list(islice(records, chunk_size))
+        if not rows:
+            return
+        rows = [{k: row[k] for k in columns if k in row} for row in rows]
+        yield _frame(rows, first_row, columns)
+        first_row += len(rows)
+
+
+def read_record_column(file_path: str, record_format: str, column: str, chunk_size: int = 50_000) -> pd.Series:
+    """Reads only ``column`` of a JSON Lines or XLSX file."""
+    chunks = [chunk[column] for chunk in iter_record_chunks(file_path, record_format, chunk_size, usecols=[column])]
+    return pd.concat(chunks) if chunks else pd.Series([], dtype=object, name=column)
@@ -0,0 +1,74 @@
+import logging
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger("email_sender")
+
+# Colunas auxiliares: chave aleatória, estrato e posição de cada linha no stream
+_KEY = "__sample_key"
+_STRATUM = "__sample_stratum"
+_POSITION = "__sample_position"
+
+
+def email_domain(emails: pd.Series) -> pd.Series:
+    """Domain of each address, lowercased ('' when there is none)."""
+    return emails.fillna("").astype(str).str.strip().str.lower().str.rpartition("@")[2]
+
+
+def reservoir_sample(frames: Iterable[pd.DataFrame], size: int, stratify: Optional[str] = None,
+                     seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    Uniform random sample of ``size`` rows from a stream of DataFrames, in one pass.
+
+    Every row gets a uniform random key and the reservoir keeps the ``size`` rows with
+    the smallest keys (a vectorized reservoir: bottom-k sampling), so memory is one
+    frame plus the reservoir no matter how long the stream is.
+
+    With ``stratify`` the sample is spread evenly across the values of that column
+    ('domain' is the email domain unless the frames have a 'domain' column): rows are
+    ordered by their rank inside their stratum and then by key, which is a random
+    round-robin over the strata. Small strata are taken whole and the rest of the
+    sample is shared by the larger ones. Pruning the reservoir to ``size`` rows
+    after each frame is exact, because a row's rank in its stratum only grows as
+    more rows arrive.
+
+    Returns:
+        The sampled rows, in stream order.
+    """
+    if size <= 0:
+        raise ValueError("O tamanho da amostra deve ser positivo")
+    rng = np.random.default_rng(seed)
+    reservoir: Optional[pd.DataFrame] = None
+    seen = 0
+    for frame in frames:
+        if frame.empty:
+            continue
+        frame = frame.assign(**{_KEY: rng.random(len(frame)), _POSITION: np.arange(seen, seen + len(frame))})
+        seen += len(frame)
+        if stratify is not None:
+            if stratify in frame.columns:
+                strata = frame[stratify].astype(object).where(frame[stratify].notna(), "").astype(str)
+            elif stratify == "domain":
+                strata = email_domain(frame["email"])
+            else:
+                raise ValueError(f"Coluna '{stratify}' não encontrada para estratificar a amostra")
+            frame[_STRATUM] = strata.to_numpy()
+        reservoir = frame if reservoir is None else pd.concat([reservoir, frame])
+        if stratify is None:
+            reservoir = reservoir.nsmallest(size, _KEY)
+        else:
+            rank = reservoir.groupby(_STRATUM, sort=False)[_KEY].rank(method="first")
+            order = np.lexsort((reservoir[_KEY].to_numpy(), rank.to_numpy()))
+            reservoir = reservoir.iloc[order[:size]]
+
+    if reservoir is None:
+        return pd.DataFrame()
+    sample = reservoir.sort_values(_POSITION).drop(columns=[_KEY, _STRATUM, _POSITION], errors="ignore")
+    if stratify is not None:
+        strata = reservoir[_STRATUM].nunique()
+        log.info(f"Sampled {len(sample)} of {seen} rows across {strata} values of '{stratify}'")
+    else:
+        log.info(f"Sampled {len(sample)} of {seen} rows")
+    return sample
@@ -0,0 +1,254 @@
+import ast
+import re
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Métodos de texto aceitos nas expressões (coluna.startswith("..."))
+STRING_METHODS = ("startswith", "endswith", "contains")
+
+# Colunas com espaços ou símbolos são escritas entre crases: `nome completo` != ""
+BACKTICK_PATTERN = re.compile(r"`([^`]+)`")
+
+# Função SQL (registrada por register_sql_functions) que converte texto em número ou NULL
+SQL_NUMBER_FUNCTION = "segment_number"
+
+_COMPARE_OPS = {
+    ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+    ast.In: "in", ast.NotIn: "not in",
+}
+# Comparação com a constante à esquerda ("10 < idade") vira "idade > 10"
+_FLIPPED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+def _text(values: pd.Series) -> pd.Series:
+    """Values as strings, missing values as ''."""
+    return values.astype(object).where(values.notna(), "").astype(str)
+
+
+def _numeric(values: pd.Series) -> pd.Series:
+    """Values as numbers, non-numeric and empty values as NaN."""
+    return pd.to_numeric(_text(values).str.strip(), errors="coerce")
+
+
+def _on_values(values: pd.Series, predicate: Callable[[pd.Series], np.ndarray]) -> np.ndarray:
+    """
+    Applies ``predicate`` to a column; a categorical column is evaluated once per
+    category and expanded through its codes instead of once per row.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        per_category = np.asarray(predicate(pd.Series(values.cat.categories, dtype=object)), dtype=bool)
+        codes = values.cat.codes.to_numpy()
+        missing = bool(np.asarray(predicate(pd.Series([None], dtype=object)))[0])
+        return np.where(codes >= 0, per_category[np.maximum(codes, 0)], missing)
+    return np.asarray(predicate(values), dtype=bool)
+
+
+class Segment:
+    """
+    A filter expression over recipient columns, e.g.
+    ``cidade == "São Paulo" and empresa != ""``.
+
+    The expression is parsed with ``ast`` and only a small grammar is accepted:
+    comparisons (``== != < <= > >=``, ``in``/``not in`` a list), ``and``/``or``/``not``,
+    the string methods ``startswith``/``endswith``/``contains`` and parentheses.
+    Bare names are columns (names that are not identifiers go between backticks)
+    and values are string or number literals. Nothing is ever evaluated as Python.
+
+    Comparisons with a string are made on the text of the column (missing = '');
+    comparisons with a number are numeric, and values that are not numbers never
+    match. The same expression compiles to a vectorized pandas mask (``mask``)
+    and to a parameterized SQL predicate (``to_sql``) with the same semantics.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        if not self.expression:
+            raise ValueError("Expressão de filtro vazia")
+        self._aliases: Dict[str, str] = {}
+
+        def alias(match: re.Match) -> str:
+            name = f"__col_{len(self._aliases)}"
+            self._aliases[name] = match.group(1)
+            return name
+
+        try:
+            tree = ast.parse(BACKTICK_PATTERN.sub(alias, self.expression), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Expressão de filtro inválida '{self.expression}': {e.msg}")
+        self.columns: Set[str] = set()
+        self._tree = self._check(tree.body)
+
+    def __repr__(self) -> str:
+        return f"Segment({self.expression!r})"
+
+    # --- Validação -------------------------------------------------------------------
+
+    def _invalid(self, node: ast.AST, reason: str) -> ValueError:
+        return ValueError(f"Expressão de filtro inválida '{self.expression}': {reason} "
+                          f"(coluna {getattr(node, 'col_offset', 0) + 1})")
+
+    def _column(self, node: ast.AST) -> str:
+        if not isinstance(node, ast.Name):
+            raise self._invalid(node, "esperado o nome de uma coluna")
+        name = self._aliases.get(node.id, node.id)
+        self.columns.add(name)
+        return name
+
+    def _literal(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            value = self._literal(node.operand)
+            if isinstance(value, str):
+                raise self._invalid(node, "sinal negativo em texto")
+            return -value
+        if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float)) and not isinstance(node.value, bool):
+            return node.value
+        raise self._invalid(node, "esperado um texto ou número")
+
+    def _check(self, node: ast.AST) -> tuple:
+        """Validates ``node`` and converts it to a small tuple tree used by mask and to_sql."""
+        if isinstance(node, ast.BoolOp):
+            op = "and" if isinstance(node.op, ast.And) else "or"
+            return (op, [self._check(value) for value in node.values])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ("not", self._check(node.operand))
+        if isinstance(node, ast.Compare):
+            terms = []
+            left = node.left
+            for op_node, right in zip(node.ops, node.comparators):
+                terms.append(self._comparison(left, _COMPARE_OPS.get(type(op_node)), right, node))
+                left = right
+            return terms[0] if len(terms) == 1 else ("and", terms)
+        if isinstance(node, ast.Call):
+            method = node.func
+            if (not isinstance(method, ast.Attribute) or method.attr not in STRING_METHODS
+                    or len(node.args) != 1 or node.keywords):
+                raise self._invalid(node, f"apenas {', '.join(STRING_METHODS)} com um argumento são aceitos")
+            value = self._literal(node.args[0])
+            if not isinstance(value, str):
+                raise self._invalid(node.args[0], f"{method.attr} exige um texto")
+            return ("method", method.attr, self._column(method.value), value)
+        raise self._invalid(node, "use comparações combinadas com and/or/not")
+
+    def _comparison(self, left: ast.AST, op: str, right: ast.AST, node: ast.AST) -> tuple:
+        if op is None:
+            raise self._invalid(node, "operador não suportado")
+        if op in ("in", "not in"):
+            if not isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+                raise self._invalid(right, f"'{op}' exige uma lista de valores")
+            values = [self._literal(element) for element in right.elts]
+            return ("in", op == "not in", self._column(left), values)
+        if isinstance(left, ast.Name):
+            return ("cmp", op, self._column(left), self._literal(right))
+        if isinstance(right, ast.Name):
+            return ("cmp", _FLIPPED[op], self._column(right), self._literal(left))
+        raise self._invalid(node, "a comparação deve envolver uma coluna")
+
+    # --- pandas ----------------------------------------------------------------------
+
+    def mask(self, df: pd.DataFrame) -> pd.Series:
+        """Boolean mask (aligned with ``df``) of the rows the expression selects."""
+        missing = self.columns - set(df.columns)
+        if missing:
+            raise ValueError(f"Colunas usadas no filtro não encontradas: {', '.join(sorted(missing))}")
+        return pd.Series(self._mask(self._tree, df), index=df.index)
+
+    def _mask(self, node: tuple, df: pd.DataFrame) -> np.ndarray:
+        kind = node[0]
+        if kind == "and":
+            return np.logical_and.reduce([self._mask(child, df) for child in node[1]])
+        if kind == "or":
+            return np.logical_or.reduce([self._mask(child, df) for child in node[1]])
+        if kind == "not":
+            return ~self._mask(node[1], df)
+        if kind == "method":
+            _, method, column, value = node
+            if method == "contains":
+                return _on_values(df[column], lambda v: _text(v).str.contains(value, regex=False))
+            return _on_values(df[column], lambda v: getattr(_text(v).str, method)(value))
+        if kind == "in":
+            _, negate, column, values = node
+            if all(isinstance(v, str) for v in values):
+                hits = _on_values(df[column], lambda v: _text(v).isin(values))
+            elif not any(isinstance(v, str) for v in values):
+                hits = _on_values(df[column], lambda v: _numeric(v).isin(values))
+            else:
+                hits = _on_values(df[column], lambda v: _text(v).isin([str(x) for x in values]))
+            return ~hits if negate else hits
+        _, op, column, value = node
+        convert = _text if isinstance(value, str) else _numeric
+        compare = {
+            "==": lambda v: convert(v) == value, "!=": lambda v: convert(v) != value,
+            "<": lambda v: convert(v) < value, "<=": lambda v: convert(v) <= value,
+            ">": lambda v: convert(v) > value, ">=": lambda v: convert(v) >= value,
+        }[op]
+        return _on_values(df[column], compare)
+
+    # --- SQL -------------------------------------------------------------------------
+
+    def to_sql(self, quote: Callable[[str], str]) -> Tuple[str, List[Any]]:
+        """
+        SQL predicate with ``?`` placeholders and its parameters.
+
+        Args:
+            quote: Quotes a column name as an identifier.
+
+        Numeric comparisons call a function that must be registered on the
+        connection with ``register_sql_functions``.
+        """
+        params: List[Any] = []
+        return self._sql(self._tree, quote, params), params
+
+    def _sql(self, node: tuple, quote: Callable[[str], str], params: List[Any]) -> str:
+        kind = node[0]
+        if kind in ("and", "or"):
+            return "(" + f" {kind.upper()} ".join(self._sql(child, quote, params) for child in node[1]) + ")"
+        if kind == "not":
+            return f"(NOT {self._sql(node[1], quote, params)})"
+        if kind == "method":
+            # Funções de texto exatas: LIKE ignora maiúsculas/minúsculas no SQLite
+            _, method, column, value = node
+            if not value:
+                return "1"
+            column = quote(column)
+            params.extend([value] * (1 if method == "contains" else 2))
+            if method == "contains":
+                return f"(instr({column}, ?) > 0)"
+            if method == "startswith":
+                return f"(substr({column}, 1, length(?)) = ?)"
+            return f"(substr({column}, -length(?)) = ?)"
+        if kind == "in":
+            _, negate, column, values = node
+            placeholders = ", ".join("?" for _ in values) or "NULL"
+            if not any(isinstance(v, str) for v in values) and values:
+                params.extend(values)
+                # Valores não numéricos nunca estão na lista (mesmo critério do pandas)
+                return f"COALESCE({self._number(column, quote)} {'NOT IN' if negate else 'IN'} ({placeholders}), {int(negate)})"
+            params.extend(str(v) for v in values)
+            return f"({quote(column)} {'NOT IN' if negate else 'IN'} ({placeholders}))"
+        _, op, column, value = node
+        params.append(value)
+        if isinstance(value, str):
+            return f"({quote(column)} {op} ?)"
+        # NaN != x é verdadeiro no pandas; no SQL NULL != x é NULL
+        return f"COALESCE({self._number(column, quote)} {op} ?, {int(op == '!=')})"
+
+    @staticmethod
+    def _number(column: str, quote: Callable[[str], str]) -> str:
+        return f"{SQL_NUMBER_FUNCTION}({quote(column)})"
+
+
+def _sql_number(value: Any) -> Optional[float]:
+    """Number in a text cell, or NULL, like ``pd.to_numeric(errors='coerce')``."""
+    try:
+        number = float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def register_sql_functions(conn: sqlite3.Connection) -> None:
+    """Registers the SQL functions used by ``Segment.to_sql`` on ``conn``."""
+    conn.create_function(SQL_NUMBER_FUNCTION, 1, _sql_number, deterministic=True)
@@ -0,0 +1,235 @@
+import csv
+import io
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+log = logging.getLogger("email_sender")
+
+# Status registrados no journal (mesmos nomes das colunas do CSV)
+STATUS_SENT = "enviado"
+STATUS_FAILED = "falhou"
+
+# Coluna com o código do motivo dos endereços recusados pela validação (ver utils.email_validation)
+STATUS_INVALID = "invalido"
+
+# Limites padrão do buffer de status: o que for atingido primeiro dispara a gravação
+DEFAULT_FLUSH_RECORDS = 100
+DEFAULT_FLUSH_BYTES = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 300  # segundos (o save_interval do CSVReader)
+
+
+class FlushPolicy:
+    """
+    Decides when buffered status changes are flushed and keeps flush metrics.
+
+    A flush is due when ``max_records`` changes or ``max_bytes`` bytes are pending,
+    or ``interval`` seconds have passed since the last flush.
+    """
+
+    def __init__(self, max_records: int = DEFAULT_FLUSH_RECORDS, max_bytes: int = DEFAULT_FLUSH_BYTES,
+                 interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.max_records = max(1, max_records)
+        self.max_bytes = max(1, max_bytes)
+        self.interval = interval
+        self.pending_records = 0
+        self.pending_bytes = 0
+        self.last_flush = time.monotonic()
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.records_flushed = 0
+
+    def add(self, nbytes: int = 0, records: int = 1) -> bool:
+        """Counts ``records`` buffered changes; returns True if a flush is now due."""
+        self.pending_records += records
+        self.pending_bytes += nbytes
+        return (
+            self.pending_records >= self.max_records
+            or self.pending_bytes >= self.max_bytes
+            or time.monotonic() - self.last_flush >= self.interval
+        )
+
+    @contextmanager
+    def flushing(self) -> Iterator[None]:
+        """Times the enclosed flush and resets the pending counters."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.flushes += 1
+            self.flush_seconds += elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self.records_flushed += self.pending_records
+            self.pending_records = 0
+            self.pending_bytes = 0
+            self.last_flush = time.monotonic()
+
+    def stats(self) -> Dict[str, float]:
+        """Flush count, records per flush and flush durations, for the run report."""
+        return {
+            "flushes": self.flushes,
+            "records": self.records_flushed,
+            "records_per_flush": round(self.records_flushed / self.flushes, 1) if self.flushes else 0.0,
+            "total_s": round(self.flush_seconds, 6),
+            "avg_ms": round(self.flush_seconds * 1000 / self.flushes, 3) if self.flushes else 0.0,
+            "max_ms": round(self.max_flush_seconds * 1000, 3),
+        }
+
+
+def journal_path_for(csv_path: str) -> str:
+    """Path of the send journal that belongs to a recipients CSV file."""
+    return f"{csv_path}.journal"
+
+
+class SendJournal:
+    """
+    Append-only log of send results (email, status, timestamp, attempt[, reason]).
+    Addresses rejected by the pre-send validation are failures with a reason code.
+
+    Records are buffered in memory and written with a single write + fsync when
+    the ``policy`` says a flush is due (record count, byte size or time interval),
+    and on close. The journal is merged back into the CSV by CSVReader.
+    """
+
+    def __init__(self, path: str, policy: Optional[FlushPolicy] = None):
+        self.path = path
+        self.policy = policy or FlushPolicy()
+        self._file = None
+        self._buffer: List[str] = []
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line)
+
+    def append(self, email: str, status: str, attempt: int = 1) -> None:
+        """Buffers one send result; flushes the buffer when the policy says so."""
+        self._writer.writerow([email.strip().lower(), status, datetime.now().isoformat(timespec="seconds"), attempt])
+        line = self._line.getvalue()
+        self._line.seek(0)
+        self._line.truncate()
+        self._buffer.append(line)
+        if self.policy.add(len(line)):
+            self.flush()
+
+    def append_invalid(self, emails: Iterable[str], reasons: Iterable[str]) -> None:
+        """Buffers the failures of a whole batch of rejected addresses, each with its reason code."""
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        self._writer.writerows([email.strip().lower(), STATUS_FAILED, timestamp, 0, reason]
+                               for email, reason in zip(emails, reasons))
+        lines = self._line.getvalue()
+        self._line.seek(0)
+        self._line.truncate()
+        if not lines:
+            return
+        self._buffer.append(lines)
+        if self.policy.add(len(lines), records=lines.count("\n")):
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered records and forces them to disk."""
+        if not self._buffer:
+            return
+        with self.policy.flushing():
+            if self._file is None:
+                self._file = open(self.path, "a", newline="", encoding="utf-8")
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def exists(self) -> bool:
+        return Path(self.path).exists() and os.path.getsize(self.path) > 0
+
+    def read(self) -> Dict[str, Dict[str, str]]:
+        """
+        Replays the journal.
+
+        Returns:
+            Mapping of email to the status columns to set, e.g. ``{"enviado": "ok"}``;
+            rejected addresses also get their reason code, e.g. ``{"falhou": "ok", "invalido": "syntax"}``.
+            A failure recorded before a later success is kept, as in the CSV.
+        """
+        statuses: Dict[str, Dict[str, str]] = {}
+        if not Path(self.path).exists():
+            return statuses
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                # Uma linha incompleta no fim do arquivo indica gravação interrompida
+                if len(row) < 2 or row[1] not in (STATUS_SENT, STATUS_FAILED):
+                    continue
+                statuses.setdefault(row[0], {})[row[1]] = "ok"
+                if len(row) >= 5 and row[4]:
+                    statuses[row[0]][STATUS_INVALID] = row[4]
+        return statuses
+
+    def discard(self) -> None:
+        """Removes the journal once it has been merged (or the flags were cleared)."""
+        self._buffer.clear()
+        self.policy.pending_records = self.policy.pending_bytes = 0
+        self.close()
+        if Path(self.path).exists():
+            os.remove(self.path)
+            log.debug(f"Send journal removed: {self.path}")
+
+
+def flags_path_for(path: str) -> str:
+    """Path of the flag sidecar that belongs to a recipients file that is never rewritten."""
+    return f"{path}.flags.csv"
+
+
+class FlagSidecar:
+    """
+    Recipient flags (unsubscribed, bounced, ...) kept next to a file that is never rewritten.
+
+    Compressed CSVs and Parquet/Arrow files are read-only inputs, so the syncs record
+    their flags here, one ``email,column,value`` line per change, and CSVReader adds
+    them as columns when the file is opened. Later lines win.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self) -> Dict[str, Dict[str, str]]:
+        """Mapping of email to its flag columns, e.g. ``{"bounced": "True"}``."""
+        flags: Dict[str, Dict[str, str]] = {}
+        if not Path(self.path).exists():
+            return flags
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) == 3:
+                    flags.setdefault(row[0], {})[row[1]] = row[2]
+        return flags
+
+    def set_flag(self, emails: Iterable[str], column: str, value: str = "True") -> int:
+        """
+        Sets ``column`` to ``value`` for ``emails`` (same contract as SQLiteRecipientStore.set_flag).
+
+        Returns:
+            Number of emails whose flag changed.
+        """
+        current = self.read()
+        changed = sorted({
+            email.lower() for email in emails
+            if current.get(email.lower(), {}).get(column) != value
+        })
+        if changed:
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows([email, column, value] for email in changed)
+                f.flush()
+                os.fsync(f.fileno())
+        return len(changed)
+
+    def discard(self) -> None:
+        if Path(self.path).exists():
+            os.remove(self.path)
+            log.debug(f"Flag sidecar removed: {self.path}")
@@ -1,7 +1,8 @@
 import os
-import re
-from typing import Dict, List, Any, Optional, Set, Union
+import functools
+from typing import Dict, List, Any, Optional, Set, Union, FrozenSet
 import jinja2
+from jinja2 import meta
 
 def get_template_environment(
     template_dir: str, 
@@ -82,6 +83,10 @@ def get_template_variables(
     """
     Extrai todas as variáveis utilizadas em um template.
     
+    A análise é feita sobre a AST do Jinja2 (``jinja2.meta``), incluindo os
+    templates referenciados via ``extends``/``include``/``import``, e o
+    resultado fica em cache por template até que o arquivo seja modificado.
+    
     Args:
         template_dir: Diretório contendo os templates
         template_name: Nome do arquivo de template
@@ -89,47 +94,42 @@ def get_template_variables(
     Returns:
         Conjunto com nomes de variáveis utilizadas no template
     """
-    # Carregar o conteúdo do template
     template_path = os.path.join(template_dir, template_name)
     if not os.path.exists(template_path):
         raise FileNotFoundError(f"Template não encontrado: {template_path}")
     
-    with open(template_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Padrão para identificar variáveis {{ var }}
-    var_pattern = r'{{\s*([a-zA-Z0-9_]+(?:\.[a-zA-Z0-9_]+)*)\s*}}'
-    # Padrão para variáveis em condicionais {% if var %}
-    cond_pattern = r'{%\s*if\s+([a-zA-Z0-9_]+(?:\.[a-zA-Z0-9_]+)*)\s*%}'
-    # Padrão para variáveis em expressões condicionais {% if var ou condicional com var %} incluindo operadores
-    extended_cond_pattern = r'{%\s*if\s+.*?([a-zA-Z0-9_]+).*?%}'
-    # Padrão para loops {% for item in items %}
-    loop_pattern = r'{%\s*for\s+[a-zA-Z0-9_]+\s+in\s+([a-zA-Z0-9_]+(?:\.[a-zA-Z0-9_]+)*)\s*%}'
-    
-    # Extrair todas as variáveis
-    variables = set()
-    
-    # Adicionar variáveis diretas {{ var }}
-    for match in re.finditer(var_pattern, content):
-        var_name = match.group(1).split('.')[0]  # Pegar apenas o nome base da variável
-        variables.add(var_name)
-    
-    # Adicionar variáveis de condicionais {% if var %}
-    for match in re.finditer(cond_pattern, content):
-        var_name = match.group(1).split('.')[0]
-        variables.add(var_name)
-    
-    # Adicionar variáveis de expressões condicionais mais complexas
-    for match in re.finditer(extended_cond_pattern, content):
-        var_name = match.group(1).split('.')[0]
-        variables.add(var_name)
-    
-    # Adicionar variáveis de loops {% for item in items %}
-    for match in re.finditer(loop_pattern, content):
-        var_name = match.group(1).split('.')[0]
-        variables.add(var_name)
+    mtime_ns = os.stat(template_path).st_mtime_ns
+    return set(_analyze_template(os.path.abspath(template_dir), template_name, mtime_ns))
+
+@functools.lru_cache(maxsize=128)
+def _analyze_template(
+    template_dir: str,
+    template_name: str,
+    mtime_ns: int
+) -> FrozenSet[str]:
+    """
+    Percorre a AST do template (e dos templates que ele referencia) coletando
+    as variáveis não declaradas. ``mtime_ns`` faz parte da chave do cache para
+    invalidá-lo quando o arquivo muda.
+    """
+    env = get_template_environment(template_dir)
+    variables: Set[str] = set()
+    pending = [template_name]
+    visited: Set[str] = set()
+    
+    while pending:
+        name = pending.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+        
+        source, _, _ = env.loader.get_source(env, name)
+        ast = env.parse(source)
+        variables |= meta.find_undeclared_variables(ast)
+        # Referências dinâmicas (ex.: {% include var %}) retornam None
+        pending.extend(ref for ref in meta.find_referenced_templates(ast) if ref)
     
-    return variables
+    return frozenset(variables)
 
 def validate_template_variables(
     required_vars: Union[List[str], Set[str]],